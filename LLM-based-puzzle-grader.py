@@ -1,7 +1,20 @@
-import os
 import csv
 import datetime
-from solvers import PuzzleSolver, SolverGrader, PuzzleData, LLMApi, Decomposer, NaiveSolver
+import threading
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from solvers import PuzzleSolver, SolverGrader, LLMApi, Decomposer, NaiveSolver, smt_block_closed, count_tokens, RequestCancelled, RequestFailed, ConversationMemory, ErrorResponse, TokenBudgetExceeded
+from puzzle_corpus import PuzzleCorpus
+from run_journal import RunJournal
+from symbolic_grader import SymbolicGrader
+from smt_diagnostics import repair_message
+from grid_clues import GridPuzzle, format_grid_answer, grade_grid_answer
+from clue_language import compiler as clue_compiler
+from response_cache import ResponseCache
+from token_ledger import ledger
+from results_store import ResultsStore, TeeWriter, RESULT_COLUMNS
+from z3_backends import make_z3_backend, telemetry, DEFAULT_Z3_BINARY, IncrementalZ3Backend
 
 # Define role descriptions
 solver_role_text = (
@@ -254,7 +267,7 @@ So, the final associations are:
 
 
 class Config:
-    def __init__(self, solving_model, grading_model, decomp_model=None, use_decomposer=False, max_tries=3, max_conversation_length=4, temperatures=[0, 0.001, 0.01], csv_name=None, use_smt=True):
+    def __init__(self, solving_model, grading_model, decomp_model=None, use_decomposer=False, max_tries=3, max_conversation_length=4, temperatures=[0, 0.001, 0.01], csv_name=None, use_smt=True, num_workers=1, cache_path=None, z3_mode="auto", z3_binary=DEFAULT_Z3_BINARY, z3_pool_size=4, z3_timeout=60, z3_memory_mb=None, smt_cache_size=1024, smt_cache_path=None, puzzle_ids=None, puzzle_glob=None, puzzle_family=None, journal_path=None, stream_smt=False, symbolic_grading=False, native_grid=False, reference_check=False, speculative_attempts=1, speculative_token_budget=None, incremental_smt=False, repair_prompts=False, conversation_window=None, conversation_token_budget=None, columnar_results=False):
         
         self.solving_model = solving_model
         self.grading_model = grading_model
@@ -265,79 +278,280 @@ class Config:
         self.temperatures = temperatures
         self.csv_name = csv_name if csv_name else f'test2-exp2-3.5-LLM_log_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
         self.use_smt = use_smt
-
-def read_file_contents(file_path):
-    with open(file_path, 'r') as file:
-        return file.read()
-
-def process_puzzles(directory_path):
-    puzzles = []
-    for folder in os.listdir(directory_path):
-        folder_path = os.path.join(directory_path, folder)
-        if os.path.isdir(folder_path):
-            answers_path = os.path.join(folder_path, 'answers.txt')
-            entities_path = os.path.join(folder_path, 'entities.txt')
-            clues_path = os.path.join(folder_path, 'clues.txt')
-            if all(os.path.exists(path) for path in [answers_path, entities_path, clues_path]):
-                answers = read_file_contents(answers_path)
-                entities = read_file_contents(entities_path)
-                clues = read_file_contents(clues_path)
-                puzzles.append(PuzzleData(answers, entities, clues))
-    return puzzles
+        self.puzzle_ids = puzzle_ids
+        self.puzzle_glob = puzzle_glob
+        self.puzzle_family = puzzle_family  # e.g. "1_*", "2_*", "puzzleNN", "puzzleNN copy" or "gameN"
+        self.journal_path = journal_path
+        self.stream_smt = stream_smt  # Stop each solver reply once its SMT-LIB block is complete
+        self.symbolic_grading = symbolic_grading  # Grade Z3 models locally, calling the LLM grader only when ambiguous
+        self.native_grid = native_grid  # Solve 1_*/2_* grid puzzles with the local clue compiler instead of the LLM
+        self.reference_check = reference_check  # Also grade the LLM's model against the SMT compiled from parseExpected.txt
+        self.speculative_attempts = max(1, speculative_attempts)  # Solver conversations run at once, one per temperature
+        self.speculative_token_budget = speculative_token_budget  # Cap on tokens the concurrent conversations of one puzzle may use
+        self.num_workers = max(1, num_workers)
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self.z3_backend = make_z3_backend(z3_mode, z3_binary, z3_pool_size, z3_timeout, z3_memory_mb, smt_cache_size, smt_cache_path)
+        self.incremental_smt = incremental_smt  # Each solver diffs its queries onto a live z3 process with push/pop
+        self.repair_prompts = repair_prompts  # Send grouped Z3 diagnostics instead of raw output, and stop once the solver is done
+        self.conversation_window = conversation_window  # Latest solver turns sent in full; older ones are summarized
+        self.conversation_token_budget = conversation_token_budget  # Hard cap on the tokens of one solver call
+        self.columnar_results = columnar_results  # Also write grades and text columns to Parquet next to the CSV
+        self.z3_mode = z3_mode
+        self.z3_binary = z3_binary
+        self.z3_timeout = z3_timeout
+        self.z3_memory_mb = z3_memory_mb
+        self.agents = AgentFactory(self)
+
+    def fingerprint(self):
+        """Hash of the settings that change a puzzle's result; journal entries are only reused when it matches."""
+        settings = [self.solving_model, self.grading_model, self.decomp_model, self.use_decomposer, self.max_tries,
+                    self.max_conversation_length, list(self.temperatures), self.use_smt, self.native_grid, self.reference_check,
+                    self.speculative_attempts, self.repair_prompts, self.conversation_window, self.conversation_token_budget,
+                    self.symbolic_grading, self.stream_smt, self.z3_mode, self.z3_binary, self.z3_timeout, self.z3_memory_mb]
+        return hashlib.sha256(json.dumps(settings).encode()).hexdigest()[:16]
+
+class AgentFactory:
+    """
+    Builds the solver, grader and decomposer agents once per run.
+
+    Agents hold conversation state, so each worker thread gets its own set;
+    between puzzles only the conversation and solver temperature are reset.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.local = threading.local()
+
+    def solver_backend(self):
+        """The shared backend, or a private incremental session per solver when incremental_smt is set."""
+        config = self.config
+        if config.incremental_smt:
+            return IncrementalZ3Backend(config.z3_backend, config.z3_binary, config.z3_timeout, config.z3_memory_mb)
+        return config.z3_backend
+
+    def solver_memory(self):
+        config = self.config
+        if config.conversation_window is None and config.conversation_token_budget is None:
+            return None
+        keep_turns = config.conversation_window if config.conversation_window is not None else config.max_conversation_length
+        return ConversationMemory(keep_turns=keep_turns, token_budget=config.conversation_token_budget)
+
+    def smt_agents(self):
+        config = self.config
+        agents = getattr(self.local, "smt", None)
+        if agents is None:
+            solver_llm = LLMApi(role=solver_role_text, client_type="OpenAI", model=config.solving_model, temperature=config.temperatures[0], cache=config.cache)
+            grader_llm = LLMApi(role=grader_role_text, client_type="OpenAI", model=config.grading_model, temperature=0, cache=config.cache)
+            solver = PuzzleSolver(solver_llm, example, self.solver_backend(), smt_block_closed if config.stream_smt else None, self.solver_memory())
+            grader = SolverGrader(grader_llm)
+            if config.symbolic_grading:
+                grader = SymbolicGrader(fallback=grader)
+            decomposer = None
+            if config.use_decomposer:
+                decomposer_llm = LLMApi(role=decomposer_role_text, client_type="OpenAI", model=config.decomp_model, temperature=0, cache=config.cache)
+                decomposer = Decomposer(decomposer_llm)
+            agents = self.local.smt = (solver, grader, decomposer)
+        solver = agents[0]
+        solver.clear()
+        solver.change_temp(config.temperatures[0])
+        return agents
+
+    def speculative_solvers(self):
+        """One solver per speculative attempt, each with its own client so temperatures do not interfere."""
+        config = self.config
+        solvers = getattr(self.local, "speculative", None)
+        if solvers is None:
+            solvers = self.local.speculative = [
+                PuzzleSolver(LLMApi(role=solver_role_text, client_type="OpenAI", model=config.solving_model, temperature=config.temperatures[0], cache=config.cache),
+                             example, self.solver_backend(), smt_block_closed if config.stream_smt else None, self.solver_memory())
+                for _ in range(config.speculative_attempts)
+            ]
+        for index, solver in enumerate(solvers):
+            solver.clear()
+            solver.change_temp(config.temperatures[index % len(config.temperatures)])
+            solver.cancel_event = None
+        return solvers
+
+    def naive_agents(self):
+        config = self.config
+        agents = getattr(self.local, "naive", None)
+        if agents is None:
+            solver_llm = LLMApi(role=solver_role_text_no_smt, client_type="OpenAI", model=config.solving_model,temperature = config.temperatures[0], cache=config.cache)
+            grader_llm = LLMApi(role=grader_role_text_no_smt, client_type="OpenAI", model=config.grading_model,temperature = 0, cache=config.cache)
+            agents = self.local.naive = (NaiveSolver(solver_llm, example_no_smt), SolverGrader(grader_llm))
+        agents[0].clear()
+        return agents
+
+class TokenBudget:
+    """Shared token allowance for the concurrent solver conversations of one puzzle."""
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def reserve(self, messages):
+        """Charges a request before it is sent; False once it would exceed the limit."""
+        tokens = sum(count_tokens(message) for message in messages)
+        with self.lock:
+            if self.used + tokens > self.limit:
+                return False
+            self.used += tokens
+            return True
+
+    def charge(self, message):
+        with self.lock:
+            self.used += count_tokens(message)
+
+def process_puzzles(directory_path, ids=None, pattern=None, family=None):
+    return PuzzleCorpus(directory_path).select(ids, pattern, family)
+
+class OrderedCSVWriter:
+    """
+    Serializes rows from concurrent puzzle workers into a single csv writer.
+
+    Rows are buffered by puzzle index and written as soon as every earlier puzzle
+    has reported, so the output order matches the puzzle order regardless of
+    which worker finishes first.
+    """
+    def __init__(self, csv_writer):
+        self.csv_writer = csv_writer
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.next_index = 0
+
+    def slot(self, index):
+        return _OrderedRowSlot(self, index)
+
+    def submit(self, index, rows):
+        with self.lock:
+            self.pending[index] = rows
+            while self.next_index in self.pending:
+                self.csv_writer.writerows(self.pending.pop(self.next_index))
+                self.next_index += 1
+
+
+class RowCollector:
+    """csv.writer-like handle that collects the rows of one puzzle."""
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, row):
+        self.rows.append(row)
+
+
+class _OrderedRowSlot(RowCollector):
+    def __init__(self, ordered_writer, index):
+        super().__init__()
+        self.ordered_writer = ordered_writer
+        self.index = index
+
+    def close(self):
+        self.ordered_writer.submit(self.index, self.rows)
+
+
+def run_puzzle(puzzle, config, csv_writer):
+    if config.native_grid and solve_puzzle_native(puzzle, csv_writer):
+        return
+    if config.use_smt:
+        solve_puzzle_smt(puzzle, config, csv_writer)
+    else:
+        solve_puzzle(puzzle, config, csv_writer)
+
+def _run_puzzle_slot(puzzle, config, slot):
+    try:
+        run_puzzle(puzzle, config, slot)
+    except Exception as e:
+        print(f"Error during puzzle: {str(e)}")
+    finally:
+        # Always release the slot so later puzzles are not held back
+        slot.close()
+
+def _run_puzzle_journaled(entry, config, journal, fingerprint):
+    collector = RowCollector()
+    try:
+        run_puzzle(entry.load(), config, collector)
+    except Exception as e:
+        # Left out of the journal so a restart retries it
+        print(f"Error during puzzle {entry.puzzle_id}: {str(e)}")
+        return
+    journal.commit(entry.content_hash, fingerprint, entry.puzzle_id, collector.rows)
+
+def run_journaled(config, puzzles, csv_writer):
+    journal = RunJournal(config.journal_path)
+    fingerprint = config.fingerprint()
+    pending = [entry for entry in puzzles.entries if not journal.is_done(entry.content_hash, fingerprint)]
+    print(f"Journal: {len(puzzles) - len(pending)} puzzles already done, {len(pending)} to run")
+    with ThreadPoolExecutor(max_workers=config.num_workers) as executor:
+        for entry in pending:
+            executor.submit(_run_puzzle_journaled, entry, config, journal, fingerprint)
+    for entry in puzzles.entries:
+        csv_writer.writerows(journal.rows(entry.content_hash, fingerprint))
 
 def run_puzzles(config):
-    puzzles = process_puzzles("./data/puzzles")
+    puzzles = process_puzzles("./data/puzzles", config.puzzle_ids, config.puzzle_glob, config.puzzle_family)
     csv_file = open(config.csv_name, 'w', newline='')
-    csv_writer = csv.writer(csv_file)
-    csv_writer.writerow(['Grade', 'Puzzle', 'SMT-LIB Code', 'Attempted Solution', 'Full LLM Convo', 'Grading Process', 'Solution'])
-
-    for puzzle in puzzles:
-        if config.use_smt:
-            solve_puzzle_smt(puzzle, config, csv_writer)
+    store = None
+    try:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(RESULT_COLUMNS)
+        if config.columnar_results:
+            store = ResultsStore(config.csv_name.removesuffix('.csv'))
+            csv_writer = TeeWriter(csv_writer, store)
+
+        if config.journal_path:
+            run_journaled(config, puzzles, csv_writer)
+        elif config.num_workers == 1:
+            for puzzle in puzzles:
+                try:
+                    run_puzzle(puzzle, config, csv_writer)
+                except Exception as e:
+                    print(f"Error during puzzle: {str(e)}")
         else:
-            solve_puzzle(puzzle, config, csv_writer)
-    csv_file.close()
+            ordered_writer = OrderedCSVWriter(csv_writer)
+            with ThreadPoolExecutor(max_workers=config.num_workers) as executor:
+                for index, puzzle in enumerate(puzzles):
+                    executor.submit(_run_puzzle_slot, puzzle, config, ordered_writer.slot(index))
+    finally:
+        # Flushes buffered rows and writes the Parquet footers even when the run is interrupted
+        csv_file.close()
+        if store is not None:
+            store.close()
+    ledger.export_csv()
+    telemetry.export_csv(config.csv_name.replace('.csv', '_solver_telemetry.csv'))
+    print("Solver calls: ", telemetry.summary())
+    print("Slowest solver calls: ", telemetry.slowest(5))
+    if config.cache:
+        print("Response cache: ", config.cache.stats())
 
 def solve_puzzle_smt(puzzle, config, csv_writer):
-    solver_llm = LLMApi(role=solver_role_text, client_type="OpenAI", model=config.solving_model, temperature=config.temperatures[0])
-    grader_llm = LLMApi(role=grader_role_text, client_type="OpenAI", model=config.grading_model, temperature=0)
-    solver = PuzzleSolver(solver_llm,example)
-    grader = SolverGrader(grader_llm)
+    solver, grader, decomposer = config.agents.smt_agents()
 
     full_description = f"{puzzle.entities}\n{puzzle.clues}"
 
     decomposed_questions_str = ""
     if config.use_decomposer:
-        decomposer_llm = LLMApi(role=decomposer_role_text, client_type="OpenAI", model=config.decomp_model, temperature=0)
-        decomposer = Decomposer(decomposer_llm)
         decomposed_questions = decomposer.decompose_puzzle(full_description)
         decomposed_questions_str = "\n".join(decomposed_questions)
 
-    retries_left = config.max_tries
-    latest_smt_code = ""
-    successful = False
-
-    while retries_left > 0 and not successful:
-        solver.clear()
-        next_input = full_description + ("\n\"Guiding Questions:\"" + decomposed_questions_str if config.use_decomposer else "")
-        try:
-            for i in range(config.max_conversation_length):
-                full_response, smt_lib_code = solver.solve_puzzle(next_input)
-                if smt_lib_code and "(set-logic" in smt_lib_code:
-                    latest_smt_code = smt_lib_code
-                next_input = solver.solve_with_z3(latest_smt_code)
-        except Exception as e:
-            print(f"Error during solving: {str(e)}") 
-        if not ("error" in next_input):
-            successful = True
-            break
-        retries_left -= 1
-        if not successful and retries_left > 0:
-            solver.change_temp(config.temperatures[min(len(config.temperatures)-1, config.max_tries - retries_left)])
-
-    attempted_solution = solver.solve_with_z3(latest_smt_code)
+    first_input = full_description + ("\n\"Guiding Questions:\"" + decomposed_questions_str if config.use_decomposer else "")
+    if config.speculative_attempts > 1:
+        solver, smt_result, latest_smt_code = solve_speculatively(first_input, config)
+    else:
+        retries_left = config.max_tries
+        latest_smt_code = ""
+        while retries_left > 0:
+            solver.clear()
+            smt_result, latest_smt_code = run_attempt(solver, first_input, config, latest_smt_code=latest_smt_code)
+            if attempt_succeeded(smt_result):
+                break
+            retries_left -= 1
+            if retries_left > 0:
+                solver.change_temp(config.temperatures[min(len(config.temperatures)-1, config.max_tries - retries_left)])
+
+    attempted_solution = solver.solve_with_z3(latest_smt_code).output
     full_convo = solver.getConversation()
-    grading_full_response, grade = grader.get_grade(puzzle.answers, full_convo, attempted_solution)
+    grading_full_response, grade = grader.get_grade(puzzle.answers, full_convo, attempted_solution, puzzle.entities)
+    if config.reference_check and puzzle.parse_expected:
+        grading_full_response += "\n" + reference_check(puzzle, config, attempted_solution)
     csv_writer.writerow([grade, full_description, latest_smt_code, attempted_solution, full_convo, grading_full_response, puzzle.answers])
 
     print("SMT-LIB Code:\n", latest_smt_code)
@@ -345,13 +559,124 @@ def solve_puzzle_smt(puzzle, config, csv_writer):
     print("Grading Process: ", grading_full_response)
     print("Grade: ", grade)
 
+def attempt_succeeded(smt_result):
+    return smt_result is not None and smt_result.status not in ("error", "timeout")
+
+def run_attempt(solver, first_input, config, budget=None, latest_smt_code=""):
+    """One solver conversation of up to max_conversation_length turns. Returns (last SolverResult, latest SMT-LIB code)."""
+    smt_result = None
+    next_input = first_input
+    try:
+        for i in range(config.max_conversation_length):
+            if solver.cancel_event is not None and solver.cancel_event.is_set():
+                break
+            if budget is not None and not budget.reserve(solver.window(next_input)):
+                print("Speculative token budget exhausted; stopping this attempt.")
+                break
+            full_response, smt_lib_code = solver.solve_puzzle(next_input)
+            if isinstance(full_response, ErrorResponse):
+                raise RequestFailed(full_response)
+            if budget is not None:
+                budget.charge(full_response)
+            if config.repair_prompts and attempt_succeeded(smt_result) and "I am done" in full_response and "(set-logic" not in full_response:
+                break  # The remaining turns would only repeat "I am done."
+            if smt_lib_code and "(set-logic" in smt_lib_code:
+                latest_smt_code = smt_lib_code
+            smt_result = solver.solve_with_z3(latest_smt_code)
+            if solver.cancel_event is not None and attempt_succeeded(smt_result):
+                solver.cancel_event.set()  # Speculative siblings are cancelled on this turn, not when the conversation ends
+                break
+            next_input = repair_message(smt_result.output, latest_smt_code) if config.repair_prompts else smt_result.output
+    except RequestCancelled:
+        pass
+    except TokenBudgetExceeded as e:
+        print(f"Stopping this attempt: {str(e)}")
+    # API and transport errors propagate, so the puzzle is not graded on an empty conversation
+    return smt_result, latest_smt_code
+
+def solve_speculatively(first_input, config):
+    """
+    Runs one solver conversation per temperature at the same time. The first
+    turn that gets an error-free Z3 result wins and the other conversations
+    are cancelled, mid-reply where the client streams. If none succeeds, the
+    conversation that produced SMT-LIB last is kept, like the sequential loop.
+    """
+    solvers = config.agents.speculative_solvers()
+    cancelled = threading.Event()
+    budget = TokenBudget(config.speculative_token_budget) if config.speculative_token_budget else None
+    for solver in solvers:
+        solver.cancel_event = cancelled
+    winner = (solvers[0], None, "")
+    won = False
+    failure = None
+    with ThreadPoolExecutor(max_workers=len(solvers)) as executor:
+        pending = {executor.submit(run_attempt, solver, first_input, config, budget): solver for solver in solvers}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                solver = pending.pop(future)
+                try:
+                    smt_result, smt_lib_code = future.result()
+                except Exception as e:
+                    failure = failure or e
+                    continue
+                if won:
+                    continue
+                if attempt_succeeded(smt_result):
+                    # The winning attempt has already set the event itself
+                    winner = (solver, smt_result, smt_lib_code)
+                    won = True
+                elif smt_lib_code:
+                    winner = (solver, smt_result, smt_lib_code)
+    if failure is not None and not attempt_succeeded(winner[1]):
+        raise failure  # A failed request may have hidden a solution; let the caller retry the puzzle
+    return winner
+
+def reference_check(puzzle, config, attempted_solution):
+    """Compares the LLM's Z3 model with the solution of the reference encoding compiled from parseExpected.txt."""
+    try:
+        reference = clue_compiler.compile(puzzle.entities, puzzle.parse_expected)
+    except ValueError as e:
+        return f"Reference check skipped: {e}"
+    result = config.z3_backend.solve(reference.smt_lib_code)
+    if "unsat" in result.output.split():  # (get-model) after unsat also prints an error, so the status is "error"
+        # e.g. puzzle09 copy, whose parseExpected.txt contradicts its own answers.txt
+        return "Reference check skipped: parseExpected.txt is unsatisfiable, so there is no reference solution."
+    reference_rows = reference.answer_rows(result.output)
+    if reference_rows is None:
+        return "Reference check skipped: the reference encoding has no model."
+    result = SymbolicGrader().grade(reference_rows, attempted_solution, puzzle.entities)
+    if result is None:
+        return "Reference check: the model could not be mapped onto the puzzle entities."
+    correct, total, _ = result
+    return f"Reference check: {correct}/{total} links agree with the reference encoding."
+
+def solve_puzzle_native(puzzle, csv_writer):
+    """Solves a grid puzzle without any API call. Returns False when the clues are outside the grid grammar."""
+    try:
+        grid = GridPuzzle(puzzle.entities, puzzle.clues)
+    except ValueError:
+        return False
+    full_description = f"{puzzle.entities}\n{puzzle.clues}"
+    solutions = grid.solutions()
+    if len(solutions) == 1:
+        attempted_solution = format_grid_answer(grid.categories, solutions[0])
+        correct, total = grade_grid_answer(puzzle.answers, attempted_solution)
+        grade = f"{correct}/{total}"
+        grading_full_response = f"Native grid solver: {correct} of {total} entity positions match the answer key.\nGrade: {grade}"
+    else:
+        attempted_solution = ""
+        grade = None
+        grading_full_response = f"Native grid solver: the clues allow {len(solutions)} solutions, expected exactly one."
+    csv_writer.writerow([grade, full_description, "N/A", attempted_solution, "N/A", grading_full_response, puzzle.answers])
+    print("Solution:\n", attempted_solution)
+    print("Grade: ", grade)
+    return True
+
 def solve_puzzle(puzzle, config, csv_writer):
     puzzle_description = puzzle.entities + "\n" + puzzle.clues
     solution = puzzle.answers
-    solver_llm = LLMApi(role=solver_role_text_no_smt, client_type="OpenAI", model=config.solving_model,temperature = config.temperatures[0])
-    grader_llm = LLMApi(role=grader_role_text_no_smt, client_type="OpenAI", model=config.grading_model,temperature = 0)
-    solver = NaiveSolver(solver_llm, example_no_smt)
-    grader = SolverGrader(grader_llm)
+    solver, grader = config.agents.naive_agents()
     full_response = solver.solve_puzzle(puzzle_description)
             
 
@@ -365,5 +690,5 @@ def solve_puzzle(puzzle, config, csv_writer):
 
 
 if __name__ == "__main__":
-    config = Config(solving_model="gpt-3.5-turbo-0125", grading_model="gpt-4o-2024-05-13", use_decomposer=False, decomp_model="gpt-3.5-turbo-0125", max_tries=1, max_conversation_length=4, temperatures=[0, 0.001, 0.01], use_smt=True)
+    config = Config(solving_model="gpt-3.5-turbo-0125", grading_model="gpt-4o-2024-05-13", use_decomposer=False, decomp_model="gpt-3.5-turbo-0125", max_tries=1, max_conversation_length=4, temperatures=[0, 0.001, 0.01], use_smt=True, num_workers=1)
     run_puzzles(config)
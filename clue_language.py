@@ -0,0 +1,270 @@
+import difflib
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from entity_values import MONTHS, NUMBER_WORDS, entity_key, quantity
+from symbolic_grader import parse_entities, parse_z3_model
+
+# Predicates asserting that the first argument has the larger value of the compared quantity
+GREATER = {"more", "after", "larger", "longer", "older", "higher", "later", "ahead", "taller", "deeper"}
+LESSER = {"fewer", "less", "before", "smaller", "shorter", "short", "lower", "younger", "behind", "closer"}
+# Header words that name the quantity a comparison refers to when several categories are ordered
+QUANTITY_HINTS = {"older": "age", "younger": "age", "taller": "height", "shorter": "height", "closer": "distance", "deeper": "depth"}
+
+_DATE = re.compile(r'^(' + '|'.join(MONTHS) + r')\s+\d')
+
+
+class Call:
+    """A predicate application such as more(June, Sodium Green, 200000)."""
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __eq__(self, other):
+        return isinstance(other, Call) and (self.name, self.args) == (other.name, other.args)
+
+    def __repr__(self):
+        return f"{self.name}({', '.join(map(repr, self.args))})"
+
+
+class Term:
+    """A bare argument: an entity name or an amount such as '2 years'."""
+    def __init__(self, text):
+        self.text = text
+
+    def __eq__(self, other):
+        return isinstance(other, Term) and self.text == other.text
+
+    def __repr__(self):
+        return self.text
+
+
+def parse_clue(line):
+    """Parses one line of parseExpected.txt into a Call tree."""
+    tokens = re.findall(r'[(),]|[^(),]+', line.strip())
+    position = 0
+
+    def expression():
+        nonlocal position
+        text = tokens[position].strip()
+        position += 1
+        if position < len(tokens) and tokens[position] == "(" and re.fullmatch(r'[A-Za-z_]+', text):
+            position += 1
+            args = []
+            while position < len(tokens) and tokens[position] != ")":
+                if tokens[position] == ",":
+                    position += 1
+                    continue
+                args.append(expression())
+            position += 1  # closing paren
+            return Call(text.lower(), args)
+        return Term(text)
+
+    if not tokens:
+        raise ValueError("Empty clue")
+    tree = expression()
+    # Stray closing parens after a complete clue are tolerated
+    if not isinstance(tree, Call) or any(token.strip() not in ("", ")") for token in tokens[position:]):
+        raise ValueError(f"Cannot parse clue: {line.strip()}")
+    return tree
+
+
+def parse_clues(text):
+    return [parse_clue(line) for line in text.strip().splitlines() if line.strip()]
+
+
+def _smt_number(value):
+    if value.denominator == 1:
+        return f"{value.numerator}.0" if value >= 0 else f"(- {-value.numerator}.0)"
+    return f"(/ {value.numerator}.0 {value.denominator}.0)"
+
+
+def _symbol(entity):
+    return "|" + entity.name.replace("|", "").replace("\\", "") + "|"
+
+
+class ReferenceEncoding:
+    """SMT-LIB compiled from parseExpected.txt; each entity is an Int slot (its row in the answer key)."""
+    def __init__(self, smt_lib_code, categories):
+        self.smt_lib_code = smt_lib_code
+        self.categories = categories
+
+    def answer_rows(self, z3_output):
+        """Reads a model of this encoding back into answers.txt rows ('a, b, c' per slot), or None without a model."""
+        model = parse_z3_model(z3_output)
+        names = list(self.categories)
+        anchors = self.categories[names[0]]
+        rows = [[entity.name] for entity in anchors]
+        for name in names[1:]:
+            for entity in self.categories[name]:
+                slot = model.get(entity.name)
+                if not isinstance(slot, int) or not 0 <= slot < len(rows):
+                    return None
+                rows[slot].append(entity.name)
+        return "\n".join(", ".join(row) for row in rows)
+
+
+class ClueCompiler:
+    """
+    Compiles the predicate language of parseExpected.txt to SMT-LIB.
+
+    Entities of the first category are pinned to slots 0..n-1 and every other
+    entity gets an Int slot, distinct within its category. is/xor/not compare
+    slots; more/fewer/before/after and the other comparisons look up the
+    value of an ordered category (numbers, dates, times, ordinals) through the
+    entity's slot. Compiled encodings are cached by content hash.
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(entities_text, clues_text):
+        return hashlib.sha256((entities_text + "\0" + clues_text).encode("utf-8")).hexdigest()
+
+    def compile(self, entities_text, clues_text):
+        key = self.content_hash(entities_text, clues_text)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        encoding = self.build(entities_text, clues_text)
+        with self.lock:
+            self.entries[key] = encoding
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return encoding
+
+    def build(self, entities_text, clues_text):
+        categories = parse_entities(entities_text)
+        if len(categories) < 2:
+            raise ValueError("A reference encoding needs at least two entity categories")
+        encoder = _Encoder(categories)
+        names = list(categories)
+        size = len(categories[names[0]])
+
+        lines = ["(set-logic QF_LIRA)"]
+        for index, entity in enumerate(categories[names[0]]):
+            lines.append(f"(define-fun {_symbol(entity)} () Int {index})")
+        for name in names[1:]:
+            for entity in categories[name]:
+                lines.append(f"(declare-fun {_symbol(entity)} () Int)")
+                lines.append(f"(assert (and (>= {_symbol(entity)} 0) (< {_symbol(entity)} {size})))")
+            lines.append(f"(assert (distinct {' '.join(_symbol(entity) for entity in categories[name])}))")
+        for tree in parse_clues(clues_text):
+            lines.append(f"; {tree!r}")
+            lines.append(f"(assert {encoder.formula(tree)})")
+        lines += ["(check-sat)", "(get-model)"]
+        return ReferenceEncoding("\n".join(lines) + "\n", categories)
+
+
+class _Encoder:
+    """Turns clue trees into SMT-LIB formulas over the slots of one puzzle's entities."""
+    def __init__(self, categories):
+        self.categories = categories
+        self.all_entities = [entity for entities in categories.values() for entity in entities]
+        self.ordered = {
+            name: [quantity(entity.name) for entity in entities]
+            for name, entities in categories.items()
+            if all(quantity(entity.name) is not None for entity in entities)
+        }
+
+    def entity(self, term):
+        if not isinstance(term, Term):
+            raise ValueError(f"Expected an entity, got {term!r}")
+        key = entity_key(term.text)
+        matches = [entity for entity in self.all_entities if entity.key == key]
+        if not matches:
+            # Tolerate small typos in the hand-written parse files, e.g. 'Mt. Dawon'
+            close = difflib.get_close_matches(key, [entity.key for entity in self.all_entities], n=1, cutoff=0.8)
+            matches = [entity for entity in self.all_entities if close and entity.key == close[0]]
+        if len(matches) != 1:
+            raise ValueError(f"Unknown entity: {term.text}")
+        return matches[0]
+
+    def same(self, a, b):
+        """Formula that entity terms (or xor groups) a and b share a slot."""
+        if isinstance(a, Call) and a.name == "xor" and isinstance(b, Call) and b.name == "xor":
+            # The two groups are matched one-to-one in some order
+            if len(a.args) != 2 or len(b.args) != 2:
+                raise ValueError("xor groups on both sides of is() must have two members")
+            (a1, a2), (b1, b2) = a.args, b.args
+            return f"(or (and {self.same(a1, b1)} {self.same(a2, b2)}) (and {self.same(a1, b2)} {self.same(a2, b1)}))"
+        if isinstance(a, Call) and a.name == "xor":
+            a, b = b, a
+        if isinstance(b, Call) and b.name == "xor":
+            options = [self.same(a, option) for option in b.args]
+            if len(options) == 2:
+                return f"(xor {options[0]} {options[1]})"
+            exactly_one = [f"(and {option} {' '.join(f'(not {other})' for other in options if other is not option)})" for option in options]
+            return f"(or {' '.join(exactly_one)})"
+        return f"(= {_symbol(self.entity(a))} {_symbol(self.entity(b))})"
+
+    def value(self, entity, category):
+        """Value of `category` in the entity's slot, as a nested ite over that category's members."""
+        members = self.categories[category]
+        values = self.ordered[category]
+        if entity.category == category:
+            return _smt_number(values[members.index(entity)])
+        expression = _smt_number(values[-1])
+        for member, member_value in reversed(list(zip(members[:-1], values[:-1]))):
+            expression = f"(ite (= {_symbol(entity)} {_symbol(member)}) {_smt_number(member_value)} {expression})"
+        return expression
+
+    def quantity_category(self, predicate, a, b, amount):
+        """Picks the ordered category a comparison is about."""
+        candidates = list(self.ordered)
+        if amount is not None:
+            unit = re.sub(r'^[\d.,\s]+|^(' + '|'.join(NUMBER_WORDS) + r')\s*', '', amount.text.strip().lower()).rstrip("s")
+            if unit:
+                by_unit = [name for name in candidates if unit in name.lower() or any(unit in entity.name.lower() for entity in self.categories[name])]
+                if by_unit:
+                    candidates = by_unit
+        others = [name for name in candidates if name not in (a.category, b.category)]
+        if others:
+            candidates = others
+        hint = QUANTITY_HINTS.get(predicate)
+        if hint and len(candidates) > 1:
+            hinted = [name for name in candidates if hint in name.lower()]
+            candidates = hinted or candidates
+        if not candidates:
+            raise ValueError(f"No ordered category to compare for {predicate}")
+        return candidates[0]
+
+    def amount_value(self, amount, category):
+        value = quantity(amount.text)
+        if value is None:
+            raise ValueError(f"Cannot read amount: {amount.text}")
+        # 'September 1 .. September 22' with '2 weeks' is measured in days
+        if "week" in amount.text.lower() and all(_DATE.match(entity.name.lower()) for entity in self.categories[category]):
+            value *= 7
+        return value
+
+    def formula(self, tree):
+        if not isinstance(tree, Call):
+            raise ValueError(f"Expected a predicate, got {tree!r}")
+        if tree.name == "is":
+            if len(tree.args) != 2:
+                raise ValueError(f"is() takes two arguments: {tree!r}")
+            return self.same(*tree.args)
+        if tree.name == "not":
+            symbols = [_symbol(self.entity(arg)) for arg in tree.args]
+            return f"(distinct {' '.join(symbols)})"
+        if tree.name in GREATER or tree.name in LESSER:
+            if len(tree.args) not in (2, 3):
+                raise ValueError(f"{tree.name}() takes two or three arguments: {tree!r}")
+            a, b = self.entity(tree.args[0]), self.entity(tree.args[1])
+            amount = tree.args[2] if len(tree.args) == 3 else None
+            category = self.quantity_category(tree.name, a, b, amount)
+            left, right = self.value(a, category), self.value(b, category)
+            if tree.name in LESSER:
+                left, right = right, left
+            if amount is None:
+                return f"(> {left} {right})"
+            return f"(= {left} (+ {right} {_smt_number(self.amount_value(amount, category))}))"
+        raise ValueError(f"Unknown predicate: {tree.name}")
+
+
+compiler = ClueCompiler()
@@ -0,0 +1,65 @@
+import re
+from fractions import Fraction
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december"]
+ORDINALS = ["first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth"]
+NUMBER_WORDS = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"]
+_SCALES = {"thousand": 1000, "million": 1000000, "billion": 1000000000}
+_TIME = re.compile(r'^(\d{1,2}):(\d{2})\s*(am|pm)?$')
+_NUMBER = re.compile(r'-?\d+(?:,\d{3})*(?:\.\d+)?')
+
+
+def entity_key(text):
+    """Normalized form used to match entity names: 'Mt. Dawon' -> 'mtdawon'."""
+    return re.sub(r'[^a-z0-9]', '', text.lower())
+
+
+def quantity(text):
+    """The value an ordered entity stands for: '1.5 million' -> 1500000, '9:00am' -> 9, 'June' -> 6, 'third' -> 3."""
+    text = text.strip().lower()
+    if text in MONTHS:
+        return Fraction(MONTHS.index(text) + 1)
+    if text in ORDINALS:
+        return Fraction(ORDINALS.index(text) + 1)
+    if text in NUMBER_WORDS:
+        return Fraction(NUMBER_WORDS.index(text))
+    time_match = _TIME.match(text)
+    if time_match:
+        hour, minute, meridiem = int(time_match.group(1)), int(time_match.group(2)), time_match.group(3)
+        if meridiem == "pm" and hour != 12:
+            hour += 12
+        return Fraction(hour) + Fraction(minute, 60)
+    match = _NUMBER.search(text)
+    if match is None:
+        return None
+    number = Fraction(match.group(0).replace(",", ""))
+    for word, scale in _SCALES.items():
+        if word in text:
+            number *= scale
+    return number
+
+
+def numeric_values(text):
+    """
+    Every number a Z3 model may use for an entity name: its quantity plus
+    the unscaled figure ('1.2 million' -> {1200000, 1.2}) or, for times,
+    the hour, hhmm and minutes of the day in 12- and 24-hour form.
+    """
+    value = quantity(text)
+    if value is None:
+        return set()
+    values = {value}
+    text = text.strip().lower()
+    time_match = _TIME.match(text)
+    if time_match:
+        hour, minute, meridiem = int(time_match.group(1)), int(time_match.group(2)), time_match.group(3)
+        hours = {hour}
+        if meridiem == "pm" and hour != 12:
+            hours.add(hour + 12)
+        for h in hours:
+            values.update({Fraction(h), Fraction(h * 100 + minute), Fraction(h * 60 + minute)})
+        return values
+    match = _NUMBER.search(text)
+    if match:
+        values.add(Fraction(match.group(0).replace(",", "")))
+    return values
@@ -0,0 +1,213 @@
+import itertools
+import re
+import numpy as np
+
+_TERM = r'([^\s:]+:\S+)'
+_CLAUSE = _TERM + r' (==|!=) ' + _TERM
+
+
+def _compare(a, op, b):
+    return (a == b) if op == "==" else (a != b)
+
+
+class Clue:
+    """One compiled clue: its text, the entities it mentions and a position predicate."""
+    def __init__(self, text, terms, predicate):
+        self.text = text
+        self.terms = terms
+        self.predicate = predicate
+
+    def holds(self, lookup):
+        """lookup maps an entity such as 'Pet:frog' to its position (an int or an array of positions)."""
+        return self.predicate(lookup)
+
+    def __repr__(self):
+        return f"Clue({self.text!r})"
+
+
+def compile_clue(text, size):
+    """
+    Compiles one grid clue into a predicate over positions 1..size.
+
+    The same predicate works on plain ints and on NumPy arrays, since it only
+    uses comparisons, arithmetic and the bitwise &, |, ^ operators.
+    """
+    clue = re.sub(r'^\s*\d+\.\s*', '', text.strip())
+    middle = (size + 1) / 2
+
+    rules = [
+        (_CLAUSE + r' or ' + _CLAUSE + r', but not both$',
+         lambda m: lambda p: _compare(p(m[1]), m[2], p(m[3])) ^ _compare(p(m[4]), m[5], p(m[6]))),
+        (_CLAUSE + r' or ' + _CLAUSE + r' or both$',
+         lambda m: lambda p: _compare(p(m[1]), m[2], p(m[3])) | _compare(p(m[4]), m[5], p(m[6]))),
+        (_CLAUSE + r'$',
+         lambda m: lambda p: _compare(p(m[1]), m[2], p(m[3]))),
+        (_TERM + r' and ' + _TERM + r' have different parity positions$',
+         lambda m: lambda p: (p(m[1]) % 2) != (p(m[2]) % 2)),
+        (_TERM + r' and ' + _TERM + r' have the same parity positions$',
+         lambda m: lambda p: (p(m[1]) % 2) == (p(m[2]) % 2)),
+        (_TERM + r' is in an odd position$',
+         lambda m: lambda p: (p(m[1]) % 2) == 1),
+        (_TERM + r' is in an even position$',
+         lambda m: lambda p: (p(m[1]) % 2) == 0),
+        (_TERM + r' is in the middle$',
+         lambda m: lambda p: p(m[1]) == middle),
+        (_TERM + r' is on the far left or far right$',
+         lambda m: lambda p: (p(m[1]) == 1) | (p(m[1]) == size)),
+        (_TERM + r' is not to the left of ' + _TERM + r'$',
+         lambda m: lambda p: p(m[1]) >= p(m[2])),
+        (_TERM + r' is not to the right of ' + _TERM + r'$',
+         lambda m: lambda p: p(m[1]) <= p(m[2])),
+        (_TERM + r' is on the left or right of ' + _TERM + r'$',
+         lambda m: lambda p: abs(p(m[1]) - p(m[2])) == 1),
+        (_TERM + r' is on the left of ' + _TERM + r'$',
+         lambda m: lambda p: p(m[1]) == p(m[2]) - 1),
+        (_TERM + r' is on the right of ' + _TERM + r'$',
+         lambda m: lambda p: p(m[1]) == p(m[2]) + 1),
+        (_TERM + r' is somewhere to the left of ' + _TERM + r'$',
+         lambda m: lambda p: p(m[1]) < p(m[2])),
+        (_TERM + r' is somewhere to the right of ' + _TERM + r'$',
+         lambda m: lambda p: p(m[1]) > p(m[2])),
+        (_TERM + r' is somewhere between ' + _TERM + r' and ' + _TERM + r'$',
+         lambda m: lambda p: ((p(m[2]) < p(m[1])) & (p(m[1]) < p(m[3]))) | ((p(m[3]) < p(m[1])) & (p(m[1]) < p(m[2])))),
+    ]
+    for pattern, build in rules:
+        match = re.match(pattern, clue)
+        if match:
+            terms = [group for group in match.groups() if group and ":" in group]
+            return Clue(clue, terms, build(match))
+    raise ValueError(f"Unrecognized clue: {clue}")
+
+
+def parse_grid_entities(entities_text):
+    """Reads 'Category: a, b, c' lines into {category: [values]}."""
+    categories = {}
+    for line in entities_text.strip().splitlines():
+        if ":" in line:
+            category, items = line.split(":", 1)
+            categories[category.strip()] = [item.strip() for item in items.split(",") if item.strip()]
+    return categories
+
+
+def parse_grid_answer(answer_key):
+    """Reads a pipe-table answer key into {'Category:value': position}."""
+    rows = [[cell.strip() for cell in line.strip().strip("|").split("|")] for line in answer_key.strip().splitlines() if line.strip()]
+    positions = [int(cell) for cell in rows[0][1:]]
+    return {f"{row[0]}:{cell}": position for row in rows[1:] for position, cell in zip(positions, row[1:])}
+
+
+def format_grid_answer(categories, assignment):
+    """Renders an assignment in the pipe-table layout of answers.txt."""
+    size = len(next(iter(categories.values())))
+    table = [[""] + [str(position) for position in range(1, size + 1)]]
+    for category, values in categories.items():
+        row = [category] + [""] * size
+        for value in values:
+            row[assignment[f"{category}:{value}"]] = value
+        table.append(row)
+    widths = [max(len(row[column]) for row in table) for column in range(size + 1)]
+    lines = []
+    for row in table:
+        cells = [row[0].ljust(widths[0])] + [cell.center(widths[column + 1]) if row is table[0] else cell.ljust(widths[column + 1]) for column, cell in enumerate(row[1:])]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+class GridPuzzle:
+    """
+    Positional grid puzzle (1_*/2_*) compiled from entities.txt and clues.txt.
+
+    check() reports which clues a candidate assignment violates. solutions()
+    enumerates the permutation space one category at a time with NumPy,
+    dropping candidates as soon as every entity of a clue has a position.
+    """
+    def __init__(self, entities_text, clues_text):
+        self.categories = parse_grid_entities(entities_text)
+        if not self.categories:
+            raise ValueError("No 'Category: a, b, c' lines in entities")
+        self.size = len(next(iter(self.categories.values())))
+        self.index = {name: {value: i for i, value in enumerate(values)} for name, values in self.categories.items()}
+        self.clues = [compile_clue(line, self.size) for line in clues_text.strip().splitlines() if line.strip()]
+        for clue in self.clues:
+            for term in clue.terms:
+                name, value = term.split(":", 1)
+                if value not in self.index.get(name, {}):
+                    raise ValueError(f"Unknown entity {term} in clue: {clue.text}")
+
+    def check(self, assignment):
+        """Returns the clues that the assignment {'Category:value': position} violates."""
+        return [clue for clue in self.clues if not clue.holds(assignment.__getitem__)]
+
+    def explain(self, assignment):
+        """Consistency verdict in the wording the LLM consistency checker was asked to use."""
+        missing = [f"{name}:{value}" for name, values in self.categories.items() for value in values if f"{name}:{value}" not in assignment]
+        if missing:
+            return "The attempted solution does not place " + ", ".join(missing) + ".\nTherefore, it is inconsistent."
+        failed = self.check(assignment)
+        if failed:
+            return "Violated clues:\n" + "\n".join(clue.text for clue in failed) + "\nTherefore, it is inconsistent."
+        return f"All {len(self.clues)} clues hold for the attempted solution.\nTherefore, it is consistent."
+
+    def category_order(self):
+        """Greedy order that lets clues fire as early as possible."""
+        remaining = list(self.categories)
+        order = []
+        while remaining:
+            def ready(category):
+                chosen = set(order) | {category}
+                return sum(all(term.split(":")[0] in chosen for term in clue.terms) for clue in self.clues)
+            best = max(remaining, key=ready)
+            order.append(best)
+            remaining.remove(best)
+        return order
+
+    def candidates(self):
+        """Returns {category: array (rows, size)} of value positions for every surviving candidate."""
+        permutations = np.array(list(itertools.permutations(range(1, self.size + 1))), dtype=np.int8)
+        columns = {}
+        assigned = set()
+        pending = list(self.clues)
+        rows = 1
+        for category in self.category_order():
+            # Cartesian product of the surviving rows with every permutation of this category
+            repeat = len(permutations)
+            columns = {name: np.repeat(block, repeat, axis=0) for name, block in columns.items()}
+            columns[category] = np.tile(permutations, (rows, 1))
+            rows *= repeat
+            assigned.add(category)
+
+            def lookup(term):
+                name, value = term.split(":", 1)
+                return columns[name][:, self.index[name][value]]
+            keep = np.ones(rows, dtype=bool)
+            for clue in [clue for clue in pending if all(term.split(":")[0] in assigned for term in clue.terms)]:
+                keep &= np.asarray(clue.holds(lookup), dtype=bool)
+                pending.remove(clue)
+            columns = {name: block[keep] for name, block in columns.items()}
+            rows = int(keep.sum())
+        return columns
+
+    def solutions(self):
+        columns = self.candidates()
+        rows = len(next(iter(columns.values()))) if columns else 0
+        return [
+            {f"{category}:{value}": int(columns[category][row, i]) for category, values in self.categories.items() for i, value in enumerate(values)}
+            for row in range(rows)
+        ]
+
+    def has_unique_solution(self):
+        return len(self.solutions()) == 1
+
+    def solve(self):
+        """Returns the answer table of the unique solution, or None when the clues allow zero or several."""
+        solutions = self.solutions()
+        if len(solutions) != 1:
+            return None
+        return format_grid_answer(self.categories, solutions[0])
+
+
+def grade_grid_answer(answer_key, attempted_solution):
+    """Returns (correct, total): how many entity positions of the answer key the attempted table reproduces."""
+    key = parse_grid_answer(answer_key)
+    attempt = parse_grid_answer(attempted_solution)
+    return sum(attempt.get(entity) == position for entity, position in key.items()), len(key)
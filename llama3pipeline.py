@@ -1,36 +1,75 @@
 import transformers
 import torch
 import gc
+import copy
+import hashlib
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 
 
 
 class LlamaPipeline:
-    def __init__(self, model_id='meta-llama/Meta-Llama-3-8B-Instruct'):
+    def __init__(self, model_id='meta-llama/Meta-Llama-3-8B-Instruct', device=None, prefix_cache_size=4, mmap=True, model_kwargs=None):
+        self.model_id = model_id
+        self.device = device if device else ("cuda" if torch.cuda.is_available() else "cpu")
+        self.mmap = mmap
+        self.model_kwargs = model_kwargs or {}  # Extra from_pretrained arguments, e.g. torch_dtype or quantization_config
         self.pipeline = self.load_model(model_id)
+        self.batcher = None
+        self.prefix_cache = OrderedDict()  # prefix hash -> (prefix token ids, past_key_values)
+        self.prefix_cache_size = prefix_cache_size
+        self.prefix_lock = threading.Lock()
 
     def load_model(self,model_id='meta-llama/Meta-Llama-3-8B-Instruct'):
-        gc.collect()
-        torch.cuda.empty_cache()
-        gc.collect()
+        model_kwargs = {"torch_dtype": torch.bfloat16 if self.device == "cuda" else torch.float32}
+        if self.mmap:
+            # Place weights directly instead of materializing a CPU copy first; safetensors shards are memory-mapped
+            model_kwargs.update(low_cpu_mem_usage=True)
+        model_kwargs.update(self.model_kwargs)
         pipeline = transformers.pipeline(
             "text-generation",
             model=model_id,
-            model_kwargs={"torch_dtype": torch.bfloat16},
-            device="cuda",
+            model_kwargs=model_kwargs,
+            device=self.device,
         )
         return pipeline
 
+    def memory_footprint(self):
+        return sum(tensor.numel() * tensor.element_size() for tensor in self.pipeline.model.state_dict().values())
+
+    def terminators(self):
+        tokenizer = self.pipeline.tokenizer
+        terminators = [tokenizer.eos_token_id]
+        eot_id = tokenizer.convert_tokens_to_ids("<|eot_id|>")
+        # Tokenizers without the Llama 3 end-of-turn token map it to unk or None
+        if eot_id is not None and eot_id != tokenizer.unk_token_id:
+            terminators.append(eot_id)
+        return terminators
+
 
-    def generate_response(self, messages, max_tokens=1400, temperature = 0.1):
+    def generate_response(self, messages, max_tokens=1400, temperature = 0.1, prefix_messages=0, stop_predicate=None):
+        """
+        prefix_messages is the number of leading messages (system role and
+        few-shot turns) that are identical across calls. Their key/value cache
+        is computed once and reused, so later calls only prefill the new turns.
+        Generation ends early once stop_predicate(text so far) is true.
+        """
+        stopping_criteria = None
+        if stop_predicate:
+            stopping_criteria = transformers.StoppingCriteriaList([TextPredicateCriteria(self.pipeline.tokenizer, stop_predicate)])
+        if prefix_messages:
+            response = self.generate_with_prefix(messages, prefix_messages, max_tokens, temperature, stopping_criteria)
+            if response is not None:
+                return response
         prompt = self.pipeline.tokenizer.apply_chat_template(
             messages,
             tokenize=False,
             add_generation_prompt=True,
         )
-        terminators = [
-            self.pipeline.tokenizer.eos_token_id,
-            self.pipeline.tokenizer.convert_tokens_to_ids("<|eot_id|>")
-        ]
+        terminators = self.terminators()
         outputs = None
         if temperature:
             outputs = self.pipeline(
@@ -39,6 +78,7 @@ class LlamaPipeline:
                 eos_token_id = terminators,
                 do_sample = True,
                 temperature = temperature,
+                stopping_criteria = stopping_criteria,
             )
         else:
             outputs = self.pipeline(
@@ -46,10 +86,104 @@ class LlamaPipeline:
                 max_new_tokens = max_tokens,
                 eos_token_id = terminators,
                 do_sample = False,
+                stopping_criteria = stopping_criteria,
             )
 
         return outputs[0]["generated_text"][len(prompt):]
 
+    def prefix_state(self, prefix_ids):
+        key = hashlib.sha256(prefix_ids.cpu().numpy().tobytes()).hexdigest()
+        with self.prefix_lock:
+            if key in self.prefix_cache:
+                self.prefix_cache.move_to_end(key)
+                return self.prefix_cache[key][1]
+            with torch.no_grad():
+                past_key_values = self.pipeline.model(prefix_ids, use_cache=True).past_key_values
+            self.prefix_cache[key] = (prefix_ids, past_key_values)
+            while len(self.prefix_cache) > self.prefix_cache_size:
+                self.prefix_cache.popitem(last=False)
+            return past_key_values
+
+    def generate_with_prefix(self, messages, prefix_messages, max_tokens, temperature, stopping_criteria=None):
+        """Returns None when the prefix does not tokenize to a clean prefix of the prompt."""
+        tokenizer = self.pipeline.tokenizer
+        model = self.pipeline.model
+        input_ids = tokenizer.apply_chat_template(messages, add_generation_prompt=True, return_tensors="pt", return_dict=True)["input_ids"].to(model.device)
+        prefix_ids = tokenizer.apply_chat_template(messages[:prefix_messages], add_generation_prompt=False, return_tensors="pt", return_dict=True)["input_ids"].to(model.device)
+        prefix_length = prefix_ids.shape[1]
+        if prefix_length >= input_ids.shape[1] or not torch.equal(input_ids[0, :prefix_length], prefix_ids[0]):
+            return None
+
+        # generate extends the cache in place, so every call works on its own copy
+        past_key_values = copy.deepcopy(self.prefix_state(prefix_ids))
+        sampling = {"do_sample": True, "temperature": temperature} if temperature else {"do_sample": False}
+        with torch.no_grad():
+            outputs = model.generate(
+                input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=past_key_values,
+                max_new_tokens=max_tokens,
+                eos_token_id=self.terminators(),
+                pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id,
+                stopping_criteria=stopping_criteria,
+                **sampling,
+            )
+        return tokenizer.decode(outputs[0, input_ids.shape[1]:], skip_special_tokens=True)
+
+    def generate_batch(self, list_of_messages, max_tokens=1400, temperature = 0.1, batch_size=8):
+        """
+        Generates one response per chat in list_of_messages.
+
+        Prompts are sorted by token length and split into batches of batch_size,
+        so each batch is only left-padded to its own longest prompt. Responses
+        come back in the input order.
+        """
+        tokenizer = self.pipeline.tokenizer
+        model = self.pipeline.model
+        # Pad with a local id rather than assigning tokenizer.pad_token, which the registry shares across pipelines
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+        prompts = [
+            tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            for messages in list_of_messages
+        ]
+        token_ids = [tokenizer(prompt, add_special_tokens=False)["input_ids"] for prompt in prompts]
+        order = sorted(range(len(prompts)), key=lambda index: len(token_ids[index]))
+
+        sampling = {"do_sample": True, "temperature": temperature} if temperature else {"do_sample": False}
+        responses = [None] * len(prompts)
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            width = max(len(token_ids[index]) for index in bucket)
+            # Decoder-only models continue from the right edge, so pad on the left
+            input_ids = torch.tensor(
+                [[pad_token_id] * (width - len(token_ids[index])) + token_ids[index] for index in bucket],
+                device=model.device,
+            )
+            attention_mask = torch.tensor(
+                [[0] * (width - len(token_ids[index])) + [1] * len(token_ids[index]) for index in bucket],
+                device=model.device,
+            )
+            with torch.no_grad():
+                outputs = model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    max_new_tokens=max_tokens,
+                    eos_token_id=self.terminators(),
+                    pad_token_id=pad_token_id,
+                    **sampling,
+                )
+            new_tokens = outputs[:, width:]
+            for index, text in zip(bucket, tokenizer.batch_decode(new_tokens, skip_special_tokens=True)):
+                responses[index] = text
+        return responses
+
+    def submit(self, messages, max_tokens=1400, temperature = 0.1):
+        """Queues one chat for micro-batched generation and waits for its response."""
+        if self.batcher is None:
+            self.batcher = MicroBatcher(self)
+        return self.batcher.submit(messages, max_tokens, temperature).result()
+
     def format_messages(self, role, list_of_messages):
         messages = []
         if role:
@@ -71,6 +205,132 @@ class LlamaPipeline:
         return messages
 
 
+class TextPredicateCriteria(transformers.StoppingCriteria):
+    """Stops generation once predicate(decoded new text) is true."""
+    def __init__(self, tokenizer, predicate):
+        self.tokenizer = tokenizer
+        self.predicate = predicate
+        self.prompt_length = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.prompt_length is None:
+            # First call happens after one new token has been appended to the prompt
+            self.prompt_length = input_ids.shape[1] - 1
+        text = self.tokenizer.decode(input_ids[0, self.prompt_length:], skip_special_tokens=True)
+        return torch.full((input_ids.shape[0],), self.predicate(text), dtype=torch.bool, device=input_ids.device)
+
+
+class ModelRegistry:
+    """
+    Loads each model configuration once per process and hands out the shared LlamaPipeline.
+
+    Pipelines are keyed by model_id, device and the LlamaPipeline keyword
+    arguments, so different dtypes or quantizations are loaded separately.
+    Before a model is loaded, least recently used models are dropped until
+    its footprint fits memory_budget bytes; a model that has not been loaded
+    before has an unknown footprint, so every other model is dropped first.
+    Dropped models are freed once no client still holds them.
+    """
+    def __init__(self, memory_budget=None):
+        self.memory_budget = memory_budget
+        self.pipelines = OrderedDict()  # (model_id, device, kwargs) -> LlamaPipeline
+        self.footprints = {}
+        self.known_footprints = {}  # Footprints of every model loaded so far, including evicted ones
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(model_id, device, kwargs):
+        return (model_id, device, repr(sorted(kwargs.items())))
+
+    def get(self, model_id='meta-llama/Meta-Llama-3-8B-Instruct', device=None, **kwargs):
+        key = self.key(model_id, device, kwargs)
+        with self.lock:
+            if key in self.pipelines:
+                self.pipelines.move_to_end(key)
+                return self.pipelines[key]
+            self.evict(self.known_footprints.get(key))
+            # Loading under the lock keeps concurrent clients from reading the same weights twice
+            llama_pipeline = LlamaPipeline(model_id, device, **kwargs)
+            self.pipelines[key] = llama_pipeline
+            self.footprints[key] = self.known_footprints[key] = llama_pipeline.memory_footprint()
+            return llama_pipeline
+
+    def evict(self, incoming=None):
+        """Drops least recently used models until incoming more bytes fit the budget (all of them when incoming is None)."""
+        if self.memory_budget is None:
+            return
+        evicted = False
+        for key in list(self.pipelines):
+            if incoming is not None and sum(self.footprints.values()) + incoming <= self.memory_budget:
+                break
+            del self.pipelines[key]
+            del self.footprints[key]
+            evicted = True
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def release(self, model_id, device=None, **kwargs):
+        with self.lock:
+            key = self.key(model_id, device, kwargs)
+            self.pipelines.pop(key, None)
+            self.footprints.pop(key, None)
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+registry = ModelRegistry()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent generation requests into batches for one LlamaPipeline.
+
+    A background thread waits up to max_wait seconds for up to max_batch_size
+    requests, groups them by sampling settings and runs each group through
+    generate_batch.
+    """
+    def __init__(self, llama_pipeline, max_batch_size=8, max_wait=0.05):
+        self.llama_pipeline = llama_pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
 
+    def submit(self, messages, max_tokens, temperature):
+        future = Future()
+        self.requests.put((messages, max_tokens, temperature, future))
+        return future
 
+    def collect(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
 
+    def run(self):
+        while True:
+            groups = {}
+            for request in self.collect():
+                groups.setdefault((request[1], request[2]), []).append(request)
+            for (max_tokens, temperature), requests in groups.items():
+                try:
+                    responses = self.llama_pipeline.generate_batch(
+                        [request[0] for request in requests], max_tokens, temperature, self.max_batch_size
+                    )
+                except Exception as e:
+                    for request in requests:
+                        request[3].set_exception(e)
+                    continue
+                for request, response in zip(requests, responses):
+                    request[3].set_result(response)
@@ -1,4 +1,5 @@
 import csv
+import os
 from fractions import Fraction
 
 def calculate_average(csv_file_path):
@@ -28,7 +29,36 @@ def calculate_average(csv_file_path):
     else:
         return "No valid data"
 
-graded_file = 'test2-exp2-3.5-LLM_log_20240527_101302.csv'
-csv_file_path = graded_file
-average = calculate_average(csv_file_path)
-print("Average:", average)
\ No newline at end of file
+def calculate_average_columnar(grades_path):
+    """Same statistics from the grades file of a ResultsStore, reading only the two integer columns."""
+    import pyarrow.compute as pc
+    from results_store import read_grades
+
+    grades = read_grades(grades_path)
+    numerator = grades.column("grade_numerator")
+    denominator = grades.column("grade_denominator")
+    valid = pc.and_(pc.is_valid(numerator), pc.greater(denominator, 0))
+    numerator, denominator = pc.filter(numerator, valid), pc.filter(denominator, valid)
+    count = len(numerator)
+    if count == 0:
+        return "No valid data"
+    ratios = pc.divide(pc.cast(numerator, "float64"), pc.cast(denominator, "float64"))
+    how_many_perfect = pc.sum(pc.less(pc.abs(pc.subtract(ratios, 1.0)), 0.001).cast("int64")).as_py() or 0
+    print(str(how_many_perfect) + " solved perfectly")
+    print(count)
+    return pc.mean(ratios).as_py()
+
+if __name__ == "__main__":
+    graded_file = 'test2-exp2-3.5-LLM_log_20240527_101302.csv'
+    csv_file_path = graded_file
+    grades_file = graded_file.removesuffix('.csv') + '_grades.parquet'
+    average = None
+    if os.path.exists(grades_file):
+        try:
+            average = calculate_average_columnar(grades_file)
+        except (ImportError, OSError, ValueError) as e:
+            # e.g. a store left without a footer by an interrupted run
+            print(f"Could not read {grades_file} ({e}), using the CSV instead")
+    if average is None:
+        average = calculate_average(csv_file_path)
+    print("Average:", average)
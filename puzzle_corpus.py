@@ -0,0 +1,171 @@
+import fnmatch
+import hashlib
+import os
+import pickle
+import re
+from solvers import PuzzleData
+
+PUZZLE_FILES = ('answers.txt', 'entities.txt', 'clues.txt')
+PARSE_FILE = 'parseExpected.txt'
+SNAPSHOT_NAME = '.corpus_index.pkl'
+SNAPSHOT_VERSION = 3
+
+
+def puzzle_family(puzzle_id):
+    """
+    Groups folder names such as 1_10, 2_7, puzzle03 and game4 into 1_*, 2_*, puzzleNN and gameN.
+
+    The "puzzleNN copy" folders hold different puzzles from their namesakes,
+    so they form their own family.
+    """
+    match = re.match(r'^(\d+)_\d+$', puzzle_id)
+    if match:
+        return f"{match.group(1)}_*"
+    if re.match(r'^puzzle\d+$', puzzle_id):
+        return "puzzleNN"
+    if re.match(r'^puzzle\d+ copy$', puzzle_id):
+        return "puzzleNN copy"
+    if re.match(r'^game\d+$', puzzle_id):
+        return "gameN"
+    return puzzle_id
+
+
+class PuzzleEntry:
+    """Manifest record for one puzzle folder."""
+    def __init__(self, puzzle_id, path, family, size, content_hash, mtime):
+        self.puzzle_id = puzzle_id
+        self.path = path
+        self.family = family
+        self.size = size
+        self.content_hash = content_hash
+        self.mtime = mtime
+
+    def load(self):
+        answers, entities, clues = (_read(os.path.join(self.path, name)) for name in PUZZLE_FILES)
+        parse_path = os.path.join(self.path, PARSE_FILE)
+        parse_expected = _read(parse_path) if os.path.exists(parse_path) else None
+        return PuzzleData(answers, entities, clues, puzzle_id=self.puzzle_id, content_hash=self.content_hash, parse_expected=parse_expected)
+
+
+def _read(file_path):
+    with open(file_path, 'r') as file:
+        return file.read()
+
+
+def _folder_mtime(folder_path):
+    """
+    Latest mtime of the puzzle files paired with that of parseExpected.txt
+    (None when absent), or None when the folder is not a complete puzzle.
+    """
+    try:
+        mtime = max(os.stat(os.path.join(folder_path, name)).st_mtime_ns for name in PUZZLE_FILES)
+    except OSError:
+        return None
+    try:
+        parse_mtime = os.stat(os.path.join(folder_path, PARSE_FILE)).st_mtime_ns
+    except OSError:
+        parse_mtime = None
+    return mtime, parse_mtime
+
+
+def _index_folder(folder_path, puzzle_id, mtime):
+    digest = hashlib.sha256()
+    size = 0
+    for name in PUZZLE_FILES:
+        with open(os.path.join(folder_path, name), 'rb') as file:
+            content = file.read()
+        digest.update(name.encode() + b'\0' + content + b'\0')
+        size += len(content)
+    parse_path = os.path.join(folder_path, PARSE_FILE)
+    if os.path.exists(parse_path):
+        # The reference encoding feeds reference_check, so editing it must invalidate journaled results
+        with open(parse_path, 'rb') as file:
+            digest.update(PARSE_FILE.encode() + b'\0' + file.read() + b'\0')
+    return PuzzleEntry(puzzle_id, folder_path, puzzle_family(puzzle_id), size, digest.hexdigest(), mtime)
+
+
+class PuzzleCorpus:
+    """
+    Indexed view over a directory of puzzle folders.
+
+    The manifest (id, family, size, content hash) is built once and kept in a
+    pickle snapshot inside the directory. On later loads only file mtimes are
+    checked, and just the changed folders are re-hashed. Puzzles are read from
+    disk lazily while iterating.
+    """
+    def __init__(self, directory_path="./data/puzzles", entries=None, use_snapshot=True):
+        self.directory_path = directory_path
+        self.use_snapshot = use_snapshot
+        self.entries = entries if entries is not None else self.build_index()
+
+    def snapshot_path(self):
+        return os.path.join(self.directory_path, SNAPSHOT_NAME)
+
+    def load_snapshot(self):
+        try:
+            with open(self.snapshot_path(), 'rb') as file:
+                snapshot = pickle.load(file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError):
+            return {}
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return {}
+        return snapshot['entries']
+
+    def save_snapshot(self, entries):
+        temp_path = self.snapshot_path() + '.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                pickle.dump({'version': SNAPSHOT_VERSION, 'entries': entries}, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.snapshot_path())
+        except OSError:
+            pass  # A read-only corpus still works, it is just indexed on every load
+
+    def build_index(self):
+        cached = self.load_snapshot() if self.use_snapshot else {}
+        entries = {}
+        changed = False
+        with os.scandir(self.directory_path) as folders:
+            for folder in folders:
+                if not folder.is_dir():
+                    continue
+                mtime = _folder_mtime(folder.path)
+                if mtime is None:
+                    continue
+                previous = cached.get(folder.name)
+                if previous is not None and previous.mtime == mtime:
+                    previous.path = folder.path
+                    entries[folder.name] = previous
+                    continue
+                entries[folder.name] = _index_folder(folder.path, folder.name, mtime)
+                changed = True
+        if self.use_snapshot and (changed or entries.keys() != cached.keys()):
+            self.save_snapshot(entries)
+        return [entries[puzzle_id] for puzzle_id in sorted(entries)]
+
+    def select(self, ids=None, pattern=None, family=None):
+        """Returns a corpus restricted to the given ids, a glob over ids, and/or a family."""
+        entries = self.entries
+        if ids is not None:
+            wanted = set(ids)
+            entries = [entry for entry in entries if entry.puzzle_id in wanted]
+        if pattern is not None:
+            entries = [entry for entry in entries if fnmatch.fnmatch(entry.puzzle_id, pattern)]
+        if family is not None:
+            entries = [entry for entry in entries if entry.family == family]
+        return PuzzleCorpus(self.directory_path, entries, self.use_snapshot)
+
+    def get(self, puzzle_id):
+        for entry in self.entries:
+            if entry.puzzle_id == puzzle_id:
+                return entry.load()
+        raise KeyError(puzzle_id)
+
+    def families(self):
+        return sorted({entry.family for entry in self.entries})
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        for entry in self.entries:
+            yield entry.load()
@@ -0,0 +1,159 @@
+import threading
+from fractions import Fraction
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.csv
+    import pyarrow.parquet
+except ImportError:  # The columnar store is optional
+    pyarrow = None
+
+RESULT_COLUMNS = ['Grade', 'Puzzle', 'SMT-LIB Code', 'Attempted Solution', 'Full LLM Convo', 'Grading Process', 'Solution']
+# The common spellings Fraction() accepts: "X/Y" or a bare integer, no spaces around the slash
+_GRADE = r'^\s*(?P<numerator>[+-]?\d{1,9})(?:/(?P<denominator>\d{1,9}))?\s*$'
+_INT32_MAX = 2**31 - 1
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("The columnar results store requires the pyarrow package")
+
+
+def _strings(values):
+    if isinstance(values, (pyarrow.Array, pyarrow.ChunkedArray)):
+        return values
+    return pyarrow.array([None if value is None else str(value) for value in values], pyarrow.string())
+
+
+def _fraction(text):
+    """(numerator, denominator) of text as llm_csv_processor's Fraction(grade) reads it, or (None, None)."""
+    try:
+        value = Fraction(text)
+    except (ValueError, ZeroDivisionError):
+        return None, None
+    if abs(value.numerator) > _INT32_MAX or value.denominator > _INT32_MAX:
+        return None, None
+    return value.numerator, value.denominator
+
+
+def parse_grades(grades):
+    """
+    Vectorized grade -> (numerator, denominator) int32 arrays, null where the grade is not a number.
+
+    "X/Y" and bare integers are split in one regex pass; the rare other
+    strings (decimals, exponents) fall back to Fraction, so a grade counts
+    exactly when calculate_average would count it.
+    """
+    _require_pyarrow()
+    strings = _strings(grades)
+    if isinstance(strings, pyarrow.ChunkedArray):
+        strings = strings.combine_chunks()
+    parts = pyarrow.compute.extract_regex(strings, _GRADE)
+    numerator = pyarrow.compute.cast(pyarrow.compute.struct_field(parts, "numerator"), pyarrow.int32())
+    denominator = pyarrow.compute.struct_field(parts, "denominator")
+    denominator = pyarrow.compute.cast(pyarrow.compute.if_else(pyarrow.compute.equal(denominator, ""), "1", denominator), pyarrow.int32())
+    # X/0 is not a grade (Fraction raises on it)
+    undefined = pyarrow.compute.equal(denominator, 0)
+    missing = pyarrow.scalar(None, pyarrow.int32())
+    numerator = pyarrow.compute.if_else(undefined, missing, numerator)
+    denominator = pyarrow.compute.if_else(undefined, missing, denominator)
+    unmatched = pyarrow.compute.and_(pyarrow.compute.is_valid(strings), pyarrow.compute.is_null(numerator))
+    indices = pyarrow.compute.indices_nonzero(unmatched).to_pylist()
+    if not indices:
+        return numerator, denominator
+    numerators, denominators = numerator.to_pylist(), denominator.to_pylist()
+    for index in indices:
+        numerators[index], denominators[index] = _fraction(strings[index].as_py())
+    return pyarrow.array(numerators, pyarrow.int32()), pyarrow.array(denominators, pyarrow.int32())
+
+
+class ResultsStore:
+    """
+    Columnar copy of the results CSV.
+
+    Grades go to <base>_grades.parquet as integer numerator/denominator
+    columns; the text columns go to <base>_text.parquet. Both share a row_id,
+    so aggregates only read the small grades file. Rows are buffered and
+    written in row groups of batch_rows.
+    """
+    def __init__(self, base_path, batch_rows=1024):
+        _require_pyarrow()
+        self.grades_path = base_path + "_grades.parquet"
+        self.text_path = base_path + "_text.parquet"
+        self.batch_rows = batch_rows
+        self.lock = threading.Lock()
+        self.pending = []
+        self.next_row_id = 0
+        self.grades_schema = pyarrow.schema([("row_id", pyarrow.int64()), ("grade_numerator", pyarrow.int32()), ("grade_denominator", pyarrow.int32())])
+        self.text_schema = pyarrow.schema([("row_id", pyarrow.int64())] + [(name, pyarrow.string()) for name in RESULT_COLUMNS])
+        self.grades_writer = pyarrow.parquet.ParquetWriter(self.grades_path, self.grades_schema)
+        self.text_writer = pyarrow.parquet.ParquetWriter(self.text_path, self.text_schema, compression="zstd")
+
+    def writerow(self, row):
+        self.writerows([row])
+
+    def writerows(self, rows):
+        with self.lock:
+            self.pending.extend(rows)
+            if len(self.pending) >= self.batch_rows:
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        if not self.pending:
+            return
+        rows, self.pending = self.pending, []
+        row_ids = pyarrow.array(range(self.next_row_id, self.next_row_id + len(rows)), pyarrow.int64())
+        self.next_row_id += len(rows)
+        columns = [[None if value is None else str(value) for value in column] for column in zip(*[list(row) + [None] * (len(RESULT_COLUMNS) - len(row)) for row in rows])]
+        numerator, denominator = parse_grades(pyarrow.array(columns[0], pyarrow.string()))
+        self.grades_writer.write_table(pyarrow.Table.from_arrays([row_ids, numerator, denominator], schema=self.grades_schema))
+        text_arrays = [row_ids] + [pyarrow.array(column, pyarrow.string()) for column in columns]
+        self.text_writer.write_table(pyarrow.Table.from_arrays(text_arrays, schema=self.text_schema))
+
+    def close(self):
+        with self.lock:
+            self.flush_locked()
+            self.grades_writer.close()
+            self.text_writer.close()
+
+
+class TeeWriter:
+    """csv.writer-like handle that forwards every row to several writers."""
+    def __init__(self, *writers):
+        self.writers = writers
+
+    def writerow(self, row):
+        for writer in self.writers:
+            writer.writerow(row)
+
+    def writerows(self, rows):
+        rows = list(rows)
+        for writer in self.writers:
+            writer.writerows(rows)
+
+
+def read_grades(grades_path):
+    """Reads just the grade columns of a store."""
+    _require_pyarrow()
+    return pyarrow.parquet.read_table(grades_path, columns=["grade_numerator", "grade_denominator"])
+
+
+def convert_csv(csv_path, base_path=None):
+    """Builds the grades file of an existing results CSV, parsing only its Grade column."""
+    _require_pyarrow()
+    base_path = base_path or csv_path.removesuffix(".csv")
+    table = pyarrow.csv.read_csv(
+        csv_path,
+        parse_options=pyarrow.csv.ParseOptions(newlines_in_values=True),
+        convert_options=pyarrow.csv.ConvertOptions(include_columns=["Grade"], column_types={"Grade": pyarrow.string()}),
+    )
+    numerator, denominator = parse_grades(table.column("Grade"))
+    row_ids = pyarrow.array(range(table.num_rows), pyarrow.int64())
+    grades = pyarrow.Table.from_arrays([row_ids, numerator, denominator], names=["row_id", "grade_numerator", "grade_denominator"])
+    pyarrow.parquet.write_table(grades, base_path + "_grades.parquet")
+    return base_path + "_grades.parquet"
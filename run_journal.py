@@ -0,0 +1,62 @@
+import json
+import os
+import threading
+
+
+class RunJournal:
+    """
+    Append-only JSONL record of finished puzzles.
+
+    Each record holds the CSV rows of one puzzle and is keyed by the puzzle's
+    content hash and the config fingerprint, so a restarted sweep can skip
+    puzzles that are already done and rebuild the results CSV from the journal.
+    Records are written with a single O_APPEND write followed by fsync; a torn
+    last line from a crash is ignored on load.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records = {}
+        self.torn_tail = False
+        self.load()
+
+    @staticmethod
+    def key(content_hash, fingerprint):
+        return f"{content_hash}:{fingerprint}"
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as file:
+            for line in file:
+                self.torn_tail = not line.endswith('\n')
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.records[record['key']] = record
+
+    def is_done(self, content_hash, fingerprint):
+        with self.lock:
+            return self.key(content_hash, fingerprint) in self.records
+
+    def commit(self, content_hash, fingerprint, puzzle_id, rows):
+        record = {'key': self.key(content_hash, fingerprint), 'puzzle_id': puzzle_id, 'rows': rows}
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self.lock:
+            if self.torn_tail:
+                # Start a fresh line after a record cut short by a crash
+                line = b'\n' + line
+                self.torn_tail = False
+            descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(descriptor, line)
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+            self.records[record['key']] = record
+
+    def rows(self, content_hash, fingerprint):
+        with self.lock:
+            record = self.records.get(self.key(content_hash, fingerprint))
+        return record['rows'] if record else []
@@ -0,0 +1,33 @@
+import importlib.util
+import os
+import time
+
+# Constructing clients does not contact the API, but the SDK insists on a key
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+spec = importlib.util.spec_from_file_location("grader", "LLM-based-puzzle-grader.py")
+grader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(grader)
+
+
+def per_puzzle_construction(config):
+    """The setup solve_puzzle_smt did for every puzzle before AgentFactory: fresh clients, solver and grader."""
+    solver_llm = grader.LLMApi(role=grader.solver_role_text, client_type="OpenAI", model=config.solving_model, temperature=config.temperatures[0])
+    grader_llm = grader.LLMApi(role=grader.grader_role_text, client_type="OpenAI", model=config.grading_model, temperature=0)
+    return grader.PuzzleSolver(solver_llm, grader.example), grader.SolverGrader(grader_llm)
+
+
+def time_per_puzzle(setup, puzzles):
+    start = time.perf_counter()
+    for _ in range(puzzles):
+        setup()
+    return (time.perf_counter() - start) / puzzles
+
+
+if __name__ == "__main__":
+    config = grader.Config(solving_model="gpt-3.5-turbo-0125", grading_model="gpt-4o-2024-05-13", z3_mode="subprocess")
+    puzzles = 50
+    before = time_per_puzzle(lambda: per_puzzle_construction(config), puzzles)
+    after = time_per_puzzle(config.agents.smt_agents, puzzles)
+    print(f"per-puzzle setup, agents built per puzzle: {before * 1000:.3f} ms")
+    print(f"per-puzzle setup, agents reused:           {after * 1000:.3f} ms")
@@ -0,0 +1,98 @@
+import re
+
+_ERROR = re.compile(r'\(error "+(?:line (\d+) column (\d+): )?(.*?)"+\)\s*$')
+# Messages that name a symbol; the rest of the message becomes the diagnostic kind
+_SYMBOL_PATTERNS = [
+    re.compile(r"^(unknown constant) (\S+)"),
+    re.compile(r"^(unknown function/constant) (\S+)"),
+    re.compile(r"^(unknown sort) '?([^'\s]+)'?"),
+    re.compile(r"^invalid declaration, (function|constant) '([^']+)'.*(already declared)"),
+    re.compile(r"^(invalid function application for) (\S+)"),
+]
+MAX_LINE_LENGTH = 100
+
+
+class Diagnostic:
+    """One (error ...) line of solver output."""
+    def __init__(self, line, column, kind, symbol, message):
+        self.line = line
+        self.column = column
+        self.kind = kind
+        self.symbol = symbol
+        self.message = message
+
+    def __repr__(self):
+        return f"Diagnostic(line={self.line}, column={self.column}, kind={self.kind!r}, symbol={self.symbol!r})"
+
+
+def _classify(message):
+    for pattern in _SYMBOL_PATTERNS:
+        match = pattern.match(message)
+        if match:
+            groups = match.groups()
+            if len(groups) == 3:
+                return f"{groups[0]} {groups[2]}", groups[1]
+            return groups[0], groups[1]
+    return message.strip(), None
+
+
+def parse_diagnostics(output):
+    """Returns a Diagnostic for every (error ...) line in the solver output."""
+    diagnostics = []
+    for raw in output.splitlines():
+        match = _ERROR.match(raw.strip())
+        if not match:
+            continue
+        line, column, message = match.groups()
+        kind, symbol = _classify(message)
+        diagnostics.append(Diagnostic(int(line) if line else None, int(column) if column else None, kind, symbol, message))
+    return diagnostics
+
+
+def group_diagnostics(diagnostics):
+    """Groups diagnostics by (kind, symbol), keeping first-seen order; values are the sorted distinct lines."""
+    groups = {}
+    for diagnostic in diagnostics:
+        lines = groups.setdefault((diagnostic.kind, diagnostic.symbol), [])
+        if diagnostic.line is not None and diagnostic.line not in lines:
+            lines.append(diagnostic.line)
+    return {key: sorted(lines) for key, lines in groups.items()}
+
+
+def repair_message(output, smt_lib_code, max_groups=8, max_examples=2):
+    """
+    Turns solver output into a compact repair prompt.
+
+    Output without errors is returned unchanged, since the model or unsat
+    verdict is what the LLM needs. Otherwise each distinct problem is listed
+    once with the lines it occurs on, and the first max_examples of those
+    lines are quoted from the code. A partial model printed after errors is
+    dropped; only the verdict is kept.
+    """
+    diagnostics = parse_diagnostics(output)
+    if not diagnostics:
+        return output
+    groups = group_diagnostics(diagnostics)
+    code_lines = smt_lib_code.splitlines()
+
+    count = f"{len(diagnostics)} error" + ("s" if len(diagnostics) > 1 else "")
+    message = [f"The solver reported {count} ({len(groups)} distinct). Fix these and send the full corrected SMT-LIB code:"]
+    for (kind, symbol), lines in list(groups.items())[:max_groups]:
+        where = f" (line{'s' if len(lines) > 1 else ''} {', '.join(map(str, lines))})" if lines else ""
+        message.append(f"- {kind}{' ' + symbol if symbol else ''}{where}")
+    if len(groups) > max_groups:
+        message.append(f"- ... and {len(groups) - max_groups} more kinds of error")
+
+    cited = sorted({line for lines in list(groups.values())[:max_groups] for line in lines[:max_examples] if 0 < line <= len(code_lines)})
+    if cited:
+        message.append("Offending lines:")
+        for line in cited:
+            text = code_lines[line - 1].strip()
+            if len(text) > MAX_LINE_LENGTH:
+                text = text[:MAX_LINE_LENGTH] + " ..."
+            message.append(f"{line}: {text}")
+
+    verdicts = [raw.strip() for raw in output.splitlines() if raw.strip() in ("sat", "unsat", "unknown")]
+    if verdicts:
+        message.append(f"Despite the errors the solver answered: {verdicts[-1]}")
+    return "\n".join(message)
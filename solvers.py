@@ -1,33 +1,154 @@
 import re
-import subprocess
-import tempfile
 import os
-from openai import OpenAI
+import asyncio
+import weakref
+import threading
+from functools import lru_cache
+from openai import OpenAI, AsyncOpenAI
+import httpx
 import tiktoken
-import csv
 from abc import ABC, abstractmethod
 import requests
-from llama3pipeline import LlamaPipeline
+from llama3pipeline import registry
+from token_ledger import ledger
+from z3_backends import make_z3_backend
+from grid_clues import GridPuzzle, parse_grid_answer
+
+
+# Upper bound on in-flight requests per provider for the async path
+PROVIDER_CONCURRENCY = {"OpenAI": 32, "HuggingFace": 8, "Llama": 1}
+
+# Sync HTTP calls to the inference API share one pooled session
+_http_session = requests.Session()
+
+# asyncio primitives and async HTTP clients are bound to the loop that created them
+_loop_resources = weakref.WeakKeyDictionary()
+
+def _loop_resource(name, factory):
+    resources = _loop_resources.setdefault(asyncio.get_running_loop(), {})
+    if name not in resources:
+        resources[name] = factory()
+    return resources[name]
+
+def provider_semaphore(provider):
+    limit = PROVIDER_CONCURRENCY.get(provider, 4)
+    return _loop_resource(("semaphore", provider), lambda: asyncio.Semaphore(limit))
+
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def get_encoding():
+    """Returns the tokenizer shared by every LLMApi, loading it on first use."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                _encoding = tiktoken.encoding_for_model("gpt-4")
+    return _encoding
+
+_openai_client = None
+_openai_lock = threading.Lock()
+
+def get_openai_client():
+    """Returns the OpenAI client (and its HTTP pool) shared by every OpenAIClient."""
+    global _openai_client
+    if _openai_client is None:
+        with _openai_lock:
+            if _openai_client is None:
+                _openai_client = OpenAI()
+    return _openai_client
+
+@lru_cache(maxsize=16384)
+def count_tokens(message):
+    # Memoized so repeated conversation turns (role text, few-shot examples) are only encoded once
+    return len(get_encoding().encode(message))
+
+
+class RequestCancelled(Exception):
+    """Raised by LLMApi.get_response when its cancel event fires while the reply is streaming."""
+
+
+class ErrorResponse(str):
+    """Text a client returns in place of a reply when the request failed; it is never cached or counted as usage."""
+
+
+class RequestFailed(Exception):
+    """Raised by a solver loop when a client answered with an ErrorResponse, so the puzzle is retried rather than graded."""
+
+
+def smt_block_closed(text):
+    """Stop predicate: a (set-logic ... (get-model) block has been written out."""
+    start = text.rfind("(set-logic")
+    return start != -1 and text.find("(get-model)", start) != -1
 
 
 class BaseClient(ABC):
+    provider = "default"
+
     @abstractmethod
     def get_response(self, role, conversation_history):
         pass
 
+    def iter_response(self, role, conversation_history):
+        """Yields the response in chunks; clients without streaming yield it whole."""
+        yield self.get_response(role, conversation_history)
+
+    def stream_response(self, role, conversation_history, stop_predicate=None):
+        """
+        Streams the response and stops as soon as stop_predicate(text so far)
+        is true, closing the stream so no further tokens are generated or billed.
+        """
+        text = ""
+        chunks = self.iter_response(role, conversation_history)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, ErrorResponse):
+                    return chunk
+                text += chunk
+                if stop_predicate and stop_predicate(text):
+                    break
+        finally:
+            chunks.close()
+        return text
+
+    async def aget_response(self, role, conversation_history):
+        async with provider_semaphore(self.provider):
+            return await self._aget_response(role, conversation_history)
+
+    async def _aget_response(self, role, conversation_history):
+        # Clients without a native async transport run the blocking call off-loop
+        return await asyncio.to_thread(self.get_response, role, conversation_history)
+
 class Llama3Client(BaseClient):
-    def __init__(self, model="meta-llama/Meta-Llama-3-8B-Instruct", temperature = 0.01):
+    provider = "Llama"
+
+    def __init__(self, model="meta-llama/Meta-Llama-3-8B-Instruct", temperature = 0.01, pipeline=None, micro_batching=False, few_shot_messages=0):
         self.temperature = temperature
-        self.client = LlamaPipeline(model)
+        self.client = pipeline if pipeline else registry.get(model)  # Weights are loaded once per process
         self.model = model
+        self.micro_batching = micro_batching  # Share one pipeline across clients to batch their calls
+        self.few_shot_messages = few_shot_messages  # Leading conversation turns that never change, e.g. len(example)
     def get_response(self, role, conversation_history):
         formatted_conversation = self.client.format_messages(role, conversation_history)
-        response = self.client.generate_response(formatted_conversation, temperature = self.temperature)
+        if self.micro_batching:
+            return self.client.submit(formatted_conversation, temperature = self.temperature)
+        # The system role and few-shot turns form a shared prefix whose KV cache is reused
+        prefix_messages = (1 if role else 0) + min(self.few_shot_messages, len(conversation_history))
+        response = self.client.generate_response(formatted_conversation, temperature = self.temperature, prefix_messages = prefix_messages)
         return response
 
+    def stream_response(self, role, conversation_history, stop_predicate=None):
+        # Generation stops inside the model loop once the predicate fires
+        formatted_conversation = self.client.format_messages(role, conversation_history)
+        prefix_messages = (1 if role else 0) + min(self.few_shot_messages, len(conversation_history))
+        return self.client.generate_response(formatted_conversation, temperature = self.temperature, prefix_messages = prefix_messages, stop_predicate = stop_predicate)
+
 class OpenAIClient(BaseClient):
+    provider = "OpenAI"
+
     def __init__(self, model="gpt-3.5-turbo", temperature = 0.01):
-        self.client = OpenAI()
+        self.client = get_openai_client()
         self.model = model
         self.temperature = temperature
 
@@ -36,6 +157,23 @@ class OpenAIClient(BaseClient):
         response = self.client.chat.completions.create(model=self.model, messages=messages, temperature=self.temperature)
         return response.choices[0].message.content
 
+    def iter_response(self, role, conversation_history):
+        messages = [{"role": "system", "content": role}] + self.process_conversation_history(conversation_history)
+        stream = self.client.chat.completions.create(model=self.model, messages=messages, temperature=self.temperature, stream=True)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Closing the connection early is what stops generation server-side
+            stream.close()
+
+    async def _aget_response(self, role, conversation_history):
+        async_client = _loop_resource("openai", AsyncOpenAI)
+        messages = [{"role": "system", "content": role}] + self.process_conversation_history(conversation_history)
+        response = await async_client.chat.completions.create(model=self.model, messages=messages, temperature=self.temperature)
+        return response.choices[0].message.content
+
     @staticmethod
     def process_conversation_history(plaintext_history):
         structured_history = []
@@ -44,8 +182,35 @@ class OpenAIClient(BaseClient):
             structured_history.append({"role": role, "content": message})
             role = "assistant" if role == "user" else "user"
         return structured_history
-    
-class Llama2Client(BaseClient):
+
+class HuggingFaceClient(BaseClient):
+    """Shared transport for the HuggingFace inference API clients."""
+    provider = "HuggingFace"
+
+    def get_response(self, role, conversation_history):
+        input_text = " ".join(conversation_history)  # You may want to format this differently depending on the model's needs
+        try:
+            response = _http_session.post(self.api_url, headers=self.headers, json={"inputs": input_text})
+            response.raise_for_status()  # Check for HTTP errors
+            return self.extract_text(response.json())
+        except requests.exceptions.RequestException as e:
+            return ErrorResponse(f"Error: {e}")
+
+    async def _aget_response(self, role, conversation_history):
+        input_text = " ".join(conversation_history)
+        http_client = _loop_resource("httpx", lambda: httpx.AsyncClient(timeout=None))
+        try:
+            response = await http_client.post(self.api_url, headers=self.headers, json={"inputs": input_text})
+            response.raise_for_status()
+            return self.extract_text(response.json())
+        except httpx.HTTPError as e:
+            return ErrorResponse(f"Error: {e}")
+
+    @abstractmethod
+    def extract_text(self, data):
+        pass
+
+class Llama2Client(HuggingFaceClient):
     def __init__(self, model="meta-llama/Llama-2-7b-chat-hf" , api_token= "default_token"):
         if api_token == "default_token":
             api_token = os.environ["HUGGING_FACE_TOK"]
@@ -53,18 +218,11 @@ class Llama2Client(BaseClient):
         self.headers = {"Authorization": f"Bearer {api_token}"}
         self.model = model
 
-    def get_response(self, role, conversation_history):
-        input_text = " ".join(conversation_history)  # You may want to format this differently depending on LLaMA's needs
-        try:
-            response = requests.post(self.api_url, headers=self.headers, json={"inputs": input_text})
-            response.raise_for_status()  # Check for HTTP errors
-            data = response.json()
-            # Adjust the following line based on the actual key in LLaMA's response
-            return data.get("generated_text", "")
-        except requests.exceptions.RequestException as e:
-            return f"Error: {e}"
+    def extract_text(self, data):
+        # Adjust the following line based on the actual key in LLaMA's response
+        return data.get("generated_text", "")
 
-class Starcoder2Client(BaseClient):
+class Starcoder2Client(HuggingFaceClient):
     def __init__(self, model="bigcode/starcoder2-15b", api_token= "default_token"):
         if api_token == "default_token":
             api_token = os.environ["HUGGING_FACE_TOK"]
@@ -72,19 +230,11 @@ class Starcoder2Client(BaseClient):
         self.headers = {"Authorization": f"Bearer {api_token}"}
         self.model = model  # Store model name for tracking
 
-    def get_response(self, role, conversation_history):
-        # Concatenate all messages for APIs that expect a single text input
-        input_text = " ".join(conversation_history)  # Adjust as needed for your API's expected format
-        try:
-            response = requests.post(self.api_url, headers=self.headers, json={"inputs": input_text})
-            response.raise_for_status()  # Raises HTTPError for bad responses
-            data = response.json()
-            # Assuming the response contains a key 'generated_text' or similar; adjust as needed
-            return data[0].get("generated_text", "")
-        except requests.exceptions.RequestException as e:
-            return f"Error: {e}"
+    def extract_text(self, data):
+        # Assuming the response contains a key 'generated_text' or similar; adjust as needed
+        return data[0].get("generated_text", "")
 class LLMApi:
-    def __init__(self, role="", client_type="OpenAI", **kwargs):
+    def __init__(self, role="", client_type="OpenAI", cache=None, **kwargs):
         if client_type == "OpenAI":
             self.client = OpenAIClient(**kwargs)
         elif client_type == "Starcoder":
@@ -96,67 +246,70 @@ class LLMApi:
         else:
             raise ValueError("Unsupported client type")
         self.role = role
+        self.client_type = client_type
+        self.cache = cache  # Optional ResponseCache shared across LLMApi instances
         self.model = self.client.model  # Use the model from the client
-        self.encoding = tiktoken.encoding_for_model("gpt-4")
+        self.encoding = get_encoding()
         self.tokens_sent = 0
         self.tokens_received = 0
-        self.api_call_count = 0
 
-    def get_response(self, conversation_history):
-        # Initialize token count for this call
-        tokens_to_send_count = 0
-        
-        # Count tokens for each message in the conversation history
-        for message in conversation_history:
-            tokens = self.encoding.encode(message)
-            tokens_to_send_count += len(tokens)
-
-        # Update the total tokens sent with the tokens for this call
-        self.tokens_sent += tokens_to_send_count
+    def get_response(self, conversation_history, stop_predicate=None, cancel_event=None):
+        cache_key = self.cache_key(conversation_history, stop_predicate)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if cancel_event is not None:
+            # Streamed so a cancelled request stops generating (and billing) mid-reply
+            def should_stop(text):
+                return cancel_event.is_set() or (stop_predicate is not None and stop_predicate(text))
+            response = self.client.stream_response(self.role, conversation_history, should_stop)
+        elif stop_predicate:
+            response = self.client.stream_response(self.role, conversation_history, stop_predicate)
+        else:
+            response = self.client.get_response(self.role, conversation_history)
+        failed = isinstance(response, ErrorResponse)  # A transient failure is neither counted nor replayed from the cache
+        if not failed:
+            self.record_usage(conversation_history, response)
+        if cancel_event is not None and cancel_event.is_set():
+            raise RequestCancelled()  # A truncated reply must not reach the cache
+        if cache_key is not None and not failed:
+            self.cache.put(cache_key, response)
+        return response
 
-        # Simulate getting a response from the API
-        response = self.client.get_response(self.role, conversation_history)
-        self.api_call_count += 1
+    async def aget_response(self, conversation_history):
+        cache_key = self.cache_key(conversation_history)
+        if cache_key is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+        response = await self.client.aget_response(self.role, conversation_history)
+        if isinstance(response, ErrorResponse):
+            return response  # Not counted or cached, as in get_response
+        self.record_usage(conversation_history, response)
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.put, cache_key, response)
+        return response
 
-        # Count tokens in the received response
-        tokens_received_count = len(self.encoding.encode(response))
+    def cache_key(self, conversation_history, stop_predicate=None):
+        if self.cache is None:
+            return None
+        temperature = getattr(self.client, "temperature", None)
+        # Responses cut short by a stop predicate are cached apart from full ones
+        client_type = self.client_type + (":" + stop_predicate.__name__ if stop_predicate else "")
+        return self.cache.make_key(client_type, self.model, temperature, self.role, conversation_history)
+
+    def record_usage(self, conversation_history, response):
+        # Count tokens for each message in the conversation history and in the response
+        tokens_to_send_count = sum(count_tokens(message) for message in conversation_history)
+        tokens_received_count = count_tokens(response)
+        self.tokens_sent += tokens_to_send_count
         self.tokens_received += tokens_received_count
-
-        if self.api_call_count >= 2:
-            self.update_csv()
-            self.api_call_count = 0
-
-        return response
+        ledger.record(self.model, self.role, tokens_to_send_count, tokens_received_count)
 
     def update_csv(self):
-        filename = "tokens_count.csv"
-        data = []
-        model_found = False
-        try:
-            if os.path.exists(filename):
-                with open(filename, 'r', newline='') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    for row in reader:
-                        if row['Model'] == self.model:
-                            row['Tokens Sent'] = int(row['Tokens Sent']) + self.tokens_sent
-                            row['Tokens Received'] = int(row['Tokens Received']) + self.tokens_received
-                            model_found = True
-                        data.append(row)
-        except FileNotFoundError:
-            print("File not found. Creating a new file.")
-        
-        if not model_found:
-            data.append({'Model': self.model, 'Tokens Sent': self.tokens_sent, 'Tokens Received': self.tokens_received})
-        
-        fieldnames = ['Model', 'Tokens Sent', 'Tokens Received']
-        with open(filename, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            if not os.path.exists(filename) or os.path.getsize(filename) == 0:
-                writer.writeheader()
-            writer.writerows(data)
-        
-        self.tokens_sent = 0
-        self.tokens_received = 0
+        # Kept for callers of the old interface; totals now live in the shared ledger
+        ledger.export_csv()
 
 
 
@@ -237,11 +390,78 @@ class LLMApi:
     def __del__(self):
         self.update_csv()
 """
+class TokenBudgetExceeded(Exception):
+    """Raised when even the smallest conversation window does not fit the per-call token budget."""
+
+
+def latest_smt_summary(dropped):
+    """Default summary of omitted turns: the latest SMT-LIB code among them and the solver output that followed it."""
+    for index in range(len(dropped) - 1, -1, -1):
+        code = PuzzleSolver.extract_substring(dropped[index], "(set-logic", "(get-model)")
+        if index % 2 == 0 and code:
+            output = dropped[index + 1] if index + 1 < len(dropped) else ""
+            summary = "Your latest SMT-LIB code from the omitted turns:\n" + code
+            return summary + ("\nThe solver answered:\n" + output if output else "")
+    return ""
+
+
+class ConversationMemory:
+    """
+    Sliding window over a conversation history that alternates user/LLM turns.
+
+    The first `fixed` messages (few-shot examples) and the opening prompt are
+    always sent, followed by the latest `keep_turns` exchanges. Older turns
+    are replaced by summarize(dropped), which by default keeps only the latest
+    SMT-LIB code and solver output. If token_budget is set, exchanges are
+    dropped until the call (role text included) fits, and TokenBudgetExceeded
+    is raised when it cannot. max_steps bounds how many calls a loop may make.
+    """
+    def __init__(self, keep_turns=4, token_budget=None, max_steps=None, summarize=latest_smt_summary):
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.max_steps = max_steps
+        self.summarize = summarize
+
+    def window(self, history, fixed=0, role=""):
+        prefix, turns = list(history[:fixed]), list(history[fixed:])
+        if len(turns) <= 1:
+            return self.fit(prefix + turns, role)
+        opening, rest = turns[0], turns[1:]
+        # rest starts with an LLM reply; keep whole exchanges so user/LLM turns still alternate
+        keep = min(len(rest), 2 * self.keep_turns + (len(rest) % 2))
+        while True:
+            dropped, kept = rest[:len(rest) - keep], rest[len(rest) - keep:]
+            first = opening
+            if dropped:
+                summary = self.summarize(dropped)
+                first = opening + f"\n\n[{len(dropped) // 2 + len(dropped) % 2} earlier turns omitted.]" + ("\n" + summary if summary else "")
+            messages = prefix + [first] + kept
+            if self.within_budget(messages, role) or keep <= 1:
+                return self.fit(messages, role)
+            keep -= 2
+
+    def within_budget(self, messages, role=""):
+        if self.token_budget is None:
+            return True
+        return count_tokens(role) + sum(count_tokens(message) for message in messages) <= self.token_budget
+
+    def fit(self, messages, role=""):
+        if not self.within_budget(messages, role):
+            raise TokenBudgetExceeded(f"Conversation needs more than {self.token_budget} tokens even after compaction")
+        return messages
+
+    def exhausted(self, steps):
+        return self.max_steps is not None and steps >= self.max_steps
+
+
 class PuzzleData:
-    def __init__(self, answers, entities, clues):
+    def __init__(self, answers, entities, clues, puzzle_id=None, content_hash=None, parse_expected=None):
         self.answers = answers
         self.entities = entities
         self.clues = clues
+        self.puzzle_id = puzzle_id
+        self.content_hash = content_hash
+        self.parse_expected = parse_expected  # Hand-written predicate form of the clues, when the folder has one
 
 
 class NaiveSolver:
@@ -255,7 +475,7 @@ class NaiveSolver:
         self.conversation.append(response)
         return response
     def clear(self):
-        self.conversation = [] if not self.example else [self.examples[0], self.examples[1]]
+        self.conversation = [] if not self.examples else [self.examples[0], self.examples[1]]
     def getConversation(self):
         """
         Formats the conversation history into a string, labeling user and LLM entries.
@@ -272,21 +492,31 @@ class NaiveSolver:
         return conversation_str
 
 class PuzzleSolver:
-    def __init__(self, LLMapi, examples=None):
+    def __init__(self, LLMapi, examples=None, z3_backend=None, stop_predicate=None, memory=None):
         self.examples = examples
+        self.memory = memory  # Optional ConversationMemory; the full history is still kept for grading
         self.LLMapi = LLMapi
+        self.z3_backend = z3_backend if z3_backend else make_z3_backend()
+        self.stop_predicate = stop_predicate  # e.g. smt_block_closed to stop streaming once the code is complete
+        self.cancel_event = None  # Set by speculative retries to abandon this conversation mid-reply
         self.conversation = [example for example in self.examples] if self.examples else []
 
     def solve_puzzle(self, prompt):
         self.conversation.append(prompt)
-        response = self.LLMapi.get_response(self.conversation)
+        response = self.LLMapi.get_response(self.window(), self.stop_predicate, self.cancel_event)
         self.conversation.append(response)
         query = self.extract_substring(response, "(set-logic", "(get-model)").replace('`', '')
         return response, query
+    def window(self, prompt=None):
+        """The messages sent for the next call, with prompt appended if it is not in the history yet."""
+        history = self.conversation + ([prompt] if prompt is not None else [])
+        if self.memory is None:
+            return history
+        return self.memory.window(history, len(self.examples) if self.examples else 0, self.LLMapi.role)
     def change_temp(self, new_temp):
         self.LLMapi.client.temperature = new_temp
     def clear(self):
-        self.conversation = self.conversation = [example for example in self.examples] if self.examples else []
+        self.conversation = list(self.examples) if self.examples else []
     def getConversation(self):
         """
         Formats the conversation history into a string, labeling user and LLM entries.
@@ -319,30 +549,8 @@ class PuzzleSolver:
         # Add len(e) to include 'e' in the result
         return s[start:end + len(e)]
     def solve_with_z3(self,smt_lib_code):
-        try:
-            # Step 1: Create a temporary file
-            with tempfile.NamedTemporaryFile(mode='w+', delete=False) as temp_file:
-                temp_file_name = temp_file.name
-                temp_file.write(smt_lib_code)
-
-            # Step 2: Execute Z3 with the temporary file
-            z3_command = ["/home/sab2335/python/z3/build/z3", temp_file_name]
-            result = subprocess.run(z3_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-            # Step 3: Capture the output
-            output = result.stdout if result.stdout else result.stderr
-
-        except Exception as e:
-            output = f"An error occurred: {e}"
-
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_file_name):
-                os.remove(temp_file_name)
-            pass
-
-        # Step 4: Return the output
-        return output
+        """Returns a SolverResult; its output is the text fed back to the LLM."""
+        return self.z3_backend.solve(smt_lib_code)
 
 
 class SolverGrader:
@@ -352,7 +560,8 @@ class SolverGrader:
         self.conversation = [] if not self.example else [self.example, ""]
         self.conv_length = 0 if not example else len(example)
 
-  def get_grade(self, answer_key, llm_answer, smt_output= None):
+  def get_grade(self, answer_key, llm_answer, smt_output= None, entities=None):
+        # entities is only used by SymbolicGrader; accepted here so the two are interchangeable
         smt_solver_output = ("\nSMT-LIB Solver Output: " + smt_output) if smt_output else ""
         to_be_graded = [("Answer to be graded: " + llm_answer + smt_solver_output + "\nAnswer Key: " +answer_key)]
         response = self.LLMapi.get_response(to_be_graded)
@@ -386,7 +595,14 @@ class AnswerFormatter:
   def obscure(self, answer_key):
         response = self.obscurer.get_response([answer_key])
         return response
-  def check_consistency(self, clues, attempted_solution):
+  def check_consistency(self, clues, attempted_solution, entities=None):
+      # Grid puzzles (1_*/2_*) with a pipe-table solution are checked by the clue compiler instead of an LLM call
+      if entities is not None:
+          try:
+              puzzle = GridPuzzle(entities, clues)
+              return puzzle.explain(parse_grid_answer(attempted_solution))
+          except (ValueError, IndexError):
+              pass
       response = self.consistency_checker .get_response([("Puzzle clues: " + clues + "\nAttempted Solution: " + attempted_solution)])
       return response
   def interpret_smt(self, convo, smt, obsc_answer_key):
@@ -408,9 +624,15 @@ class AnswerFormatter:
 
 
 
+def earlier_steps_summary(dropped):
+    steps = [message.strip().splitlines()[0] for message in dropped[0::2] if message.strip()]
+    return ("Steps given so far:\n" + "\n".join(steps)) if steps else ""
+
+
 class Decomposer:
-    def __init__(self, LLMapi):
+    def __init__(self, LLMapi, memory=None):
         self.LLMapi = LLMapi
+        self.memory = memory if memory is not None else ConversationMemory(keep_turns=4, max_steps=20, summarize=earlier_steps_summary)
 
     def decompose_puzzle(self, puzzle):
         messages = [puzzle]
@@ -435,15 +657,13 @@ class Decomposer:
         # Define a role message to guide the LLM through the gradual decomposition
         gradual_decomposition_role = "Role: Given a logic puzzle, break it down into sequential steps necessary for solving it. Start with the easiest or first logical step, and proceed to the next steps in order. When there are no more steps, give the exact phrase \"no more steps\"."
 
-        conversation_history.append(puzzle)
-
-        while True:
-            # Ask for the next step in the decomposition
+        while not self.memory.exhausted(current_step - 1):
+            # Ask for the next step in the decomposition; the puzzle opens the first user turn
             ask_for_step = f"What is step {current_step} in solving this puzzle?"
-            conversation_history.append(ask_for_step)
+            conversation_history.append(f"{puzzle}\n\n{ask_for_step}" if current_step == 1 else ask_for_step)
 
-            # Generate the response
-            step_response = self.LLMapi.get_response(conversation_history)
+            # Generate the response from the compacted history
+            step_response = self.LLMapi.get_response(self.memory.window(conversation_history, role=self.LLMapi.role))
 
             # Check if the response indicates completion or provides a valid next step
             if "no more steps" in step_response.lower() or step_response.strip() == "":
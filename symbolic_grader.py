@@ -0,0 +1,329 @@
+import re
+from fractions import Fraction
+from entity_values import entity_key, numeric_values
+
+_TOKEN = re.compile(r'\(|\)|"(?:[^"]|"")*"|\|[^|]*\||[^\s()]+')
+
+
+def parse_sexprs(text):
+    """Parses every s-expression in text into nested lists of atoms."""
+    stack = [[]]
+    for token in _TOKEN.findall(text):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) > 1:
+                finished = stack.pop()
+                stack[-1].append(finished)
+        else:
+            stack[-1].append(token)
+    while len(stack) > 1:
+        finished = stack.pop()
+        stack[-1].append(finished)
+    return stack[0]
+
+
+def _evaluate(value):
+    if isinstance(value, list):
+        if len(value) == 2 and value[0] == "-":
+            inner = _evaluate(value[1])
+            return -inner if isinstance(inner, (int, Fraction)) else None
+        if len(value) == 3 and value[0] == "/":
+            numerator, denominator = _evaluate(value[1]), _evaluate(value[2])
+            if isinstance(numerator, (int, Fraction)) and isinstance(denominator, (int, Fraction)) and denominator:
+                return Fraction(numerator) / Fraction(denominator)
+        return None
+    if value in ("true", "false"):
+        return value == "true"
+    if re.fullmatch(r'\d+', value):
+        return int(value)
+    if re.fullmatch(r'\d+\.\d+', value):
+        return Fraction(value)
+    return value.strip("|")
+
+
+def parse_z3_model(output):
+    """Returns {name: value} for every nullary define-fun in a Z3 model."""
+    model = {}
+    def visit(node):
+        for item in node:
+            if not isinstance(item, list):
+                continue
+            if len(item) == 5 and item[0] == "define-fun" and item[2] == []:
+                model[item[1].strip("|")] = _evaluate(item[4])
+            else:
+                visit(item)
+    visit(parse_sexprs(output))
+    return model
+
+
+class Entity:
+    def __init__(self, name, category):
+        self.name = name.strip()
+        self.category = category
+        self.key = entity_key(self.name)
+        self.numbers = numeric_values(self.name)
+
+    def __repr__(self):
+        return f"Entity({self.name!r}, {self.category!r})"
+
+
+def parse_entities(entities_text):
+    """
+    Reads entities.txt in either layout:
+    'Category: a, b, c' lines (1_*/2_*), or a category header line, a blank
+    line and one comma-separated line of items per category (puzzleNN/gameN).
+    """
+    lines = [line.strip() for line in entities_text.strip().splitlines()]
+    categories = {}
+    if lines and ":" in lines[0]:
+        for line in lines:
+            if ":" in line:
+                category, items = line.split(":", 1)
+                categories[category.strip()] = [Entity(item, category.strip()) for item in items.split(",") if item.strip()]
+        return categories
+    names = [name.strip() for name in lines[0].split(",")]
+    item_lines = [line for line in lines[1:] if line]
+    for name, line in zip(names, item_lines):
+        categories[name] = [Entity(item, name) for item in line.split(",") if item.strip()]
+    return categories
+
+
+def parse_answer_key(answer_key):
+    """
+    Returns ("table", {(category, entity key): position}, positions) for the
+    pipe-table keys of 1_*/2_*, or ("rows", [[name, ...], ...], None) for the
+    comma-separated keys of puzzleNN/gameN.
+    """
+    lines = [line.strip() for line in answer_key.strip().splitlines() if line.strip()]
+    if lines and lines[0].startswith("|"):
+        rows = [[cell.strip() for cell in line.strip("|").split("|")] for line in lines]
+        positions = [int(cell) if cell.isdigit() else index + 1 for index, cell in enumerate(rows[0][1:])]
+        placements = {}
+        for row in rows[1:]:
+            for position, cell in zip(positions, row[1:]):
+                placements[(row[0], entity_key(cell))] = position
+        return "table", placements, positions
+    return "rows", [[cell.strip() for cell in line.split(",")] for line in lines], None
+
+
+class _Links:
+    """Union-find over entities linked by the model."""
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, entity):
+        self.parent.setdefault(entity, entity)
+        while self.parent[entity] is not entity:
+            self.parent[entity] = self.parent[self.parent[entity]]
+            entity = self.parent[entity]
+        return entity
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+
+class SymbolicGrader:
+    """
+    Grades a Z3 model against answers.txt without an LLM call.
+
+    Model variables are mapped onto entities by normalized name matching and
+    their values interpreted as positions, linked entities or shared slots.
+    When that mapping is ambiguous or incomplete, the fallback grader (an
+    LLM-backed SolverGrader) is used instead.
+    """
+    def __init__(self, fallback=None):
+        self.fallback = fallback
+
+    def get_grade(self, answer_key, llm_answer, smt_output=None, entities=None):
+        result = self.grade(answer_key, smt_output or "", entities) if entities else None
+        if result is None:
+            if self.fallback is None:
+                return "Symbolic grading was ambiguous and no fallback grader is configured.", None
+            return self.fallback.get_grade(answer_key, llm_answer, smt_output)
+        correct, total, explanation = result
+        return explanation + f"\nGrade: {correct}/{total}", f"{correct}/{total}"
+
+    def grade(self, answer_key, smt_output, entities_text):
+        """Returns (X, Y, explanation), or None when the model cannot be mapped unambiguously."""
+        categories = parse_entities(entities_text)
+        kind, key, positions = parse_answer_key(answer_key)
+        model = parse_z3_model(smt_output)
+        if kind == "table":
+            total = len(key)
+        else:
+            total = sum(len(row) - 1 for row in key)
+        if total == 0:
+            return None
+        if not model:
+            return 0, total, "The solver output contains no model, so no assignments can be credited."
+        if kind == "table":
+            return self.grade_table(key, positions, categories, model)
+        return self.grade_rows(key, categories, model)
+
+    @staticmethod
+    def match_entities(name, categories):
+        name_key = entity_key(name)
+        matches = []
+        for entities in categories.values():
+            for entity in entities:
+                if not entity.key or entity.key not in name_key:
+                    continue
+                # Bare numbers like '5' would match far too many variable names
+                if entity.key.isdigit() and len(entity.key) < 3:
+                    continue
+                matches.append(entity)
+        # Drop entities whose name is contained in a longer match
+        return [entity for entity in matches if not any(other is not entity and entity.key in other.key for other in matches)]
+
+    @staticmethod
+    def named_category(name, categories, exclude):
+        name_key = entity_key(name)
+        found = []
+        for category in categories:
+            if category == exclude:
+                continue
+            words = [entity_key(word) for word in re.split(r'[\s()]+', category)]
+            stems = [word[:-1] if word.endswith("s") and len(word) > 3 else word for word in words if len(word) >= 3]
+            if any(stem in name_key for stem in stems):
+                found.append(category)
+        return found[0] if len(found) == 1 else None
+
+    def value_entity(self, value, categories, exclude=None, preferred=None):
+        """The entity a model value denotes, if exactly one fits."""
+        if isinstance(value, str):
+            matches = [entity for entity in self.match_entities(value, categories) if entity.category != exclude]
+            return matches[0] if len(matches) == 1 else None
+        if isinstance(value, bool) or value is None:
+            return None
+        candidates = [
+            entity for category, entities in categories.items() if category != exclude
+            for entity in entities if Fraction(value) in entity.numbers
+        ]
+        if preferred is not None:
+            preferred_candidates = [entity for entity in candidates if entity.category == preferred]
+            if preferred_candidates:
+                candidates = preferred_candidates
+        return candidates[0] if len(candidates) == 1 else None
+
+    def slot_categories(self, categories, model):
+        """
+        Categories whose own entities are integer model variables. Integers are
+        then slots shared with those entities, so e.g. 1 is not read as January.
+        """
+        found = set()
+        for name, value in model.items():
+            if isinstance(value, (int, Fraction)) and not isinstance(value, bool):
+                matched = self.match_entities(name, categories)
+                if len(matched) == 1:
+                    found.add(matched[0].category)
+        return found
+
+    def collect(self, categories, model):
+        """Splits the model into direct links between entities and per-entity slot values."""
+        links = []
+        slots = {}
+        slot_categories = self.slot_categories(categories, model)
+        numeric_categories = {category: entities for category, entities in categories.items() if category not in slot_categories}
+        size = max((len(entities) for entities in categories.values()), default=0)
+        slot_range = set(range(size + 1))  # 0-based or 1-based slot numbers
+        for name, value in model.items():
+            matched = self.match_entities(name, categories)
+            if isinstance(value, bool):
+                if value and len(matched) >= 2 and len({entity.category for entity in matched}) == len(matched):
+                    links.extend((matched[0], other) for other in matched[1:])
+                continue
+            if len(matched) != 1:
+                continue
+            entity = matched[0]
+            preferred = self.named_category(name, categories, entity.category)
+            lookup = categories if isinstance(value, str) else numeric_categories
+            target = self.value_entity(value, lookup, exclude=entity.category, preferred=preferred)
+            if target is not None and not isinstance(value, str) and value in slot_range and target.category != preferred:
+                return links, None  # The integer reads equally well as a slot number; let the fallback decide
+            if target is not None:
+                links.append((entity, target))
+            elif isinstance(value, (int, Fraction)) and not isinstance(value, bool):
+                slots.setdefault(entity, set()).add(value)
+        if any(len(values) > 1 for values in slots.values()):
+            return links, None  # One entity in two unrelated slots cannot be read as a solution
+        return links, {entity: values.pop() for entity, values in slots.items()}
+
+    def grade_table(self, key, positions, categories, model):
+        links, slots = self.collect(categories, model)
+        if slots is None:
+            return None
+        placed = dict(slots)
+        # Symbol-valued position variables such as Food_1 = apricot
+        for name, value in model.items():
+            if isinstance(value, str) and not self.match_entities(name, categories):
+                digits = re.findall(r'\d+', name)
+                target = self.value_entity(value, categories)
+                if digits and target is not None:
+                    placed[target] = int(digits[-1])
+        if not placed:
+            return None
+        values = set(placed.values())
+        if values <= set(range(len(positions))) and not values <= set(positions):
+            placed = {entity: position + 1 for entity, position in placed.items()}  # 0-based encoding
+        for a, b in links:
+            if a in placed and b not in placed:
+                placed[b] = placed[a]
+            elif b in placed and a not in placed:
+                placed[a] = placed[b]
+
+        correct = 0
+        missing = []
+        for (category, entity_key), position in key.items():
+            entity = next((e for e in categories.get(category, []) if e.key == entity_key), None)
+            if entity is None or entity not in placed:
+                missing.append(f"{category}:{entity_key}")
+                continue
+            correct += placed[entity] == position
+        if missing:
+            return None
+        explanation = f"Symbolic grading: {correct} of {len(key)} entity positions in the model match the answer key."
+        return correct, len(key), explanation
+
+    def grade_rows(self, key, categories, model):
+        links, slots = self.collect(categories, model)
+        if slots is None:
+            return None
+        union = _Links()
+        for a, b in links:
+            union.union(a, b)
+        by_slot = {}
+        for entity, slot in slots.items():
+            by_slot.setdefault(slot, []).append(entity)
+        for group in by_slot.values():
+            for other in group[1:]:
+                union.union(group[0], other)
+
+        all_entities = [entity for entities in categories.values() for entity in entities]
+        groups = {}
+        for entity in all_entities:
+            if entity in union.parent:
+                groups.setdefault(union.find(entity), []).append(entity)
+        # A group holding two entities of one category means the slots were not entity links
+        for members in groups.values():
+            if len({entity.category for entity in members}) != len(members):
+                return None
+
+        def lookup(name):
+            matches = [entity for entity in all_entities if entity.key == entity_key(name)]
+            return matches[0] if len(matches) == 1 else None
+
+        correct = 0
+        total = 0
+        for row in key:
+            anchor = lookup(row[0])
+            if anchor is None or anchor not in union.parent:
+                return None
+            for name in row[1:]:
+                other = lookup(name)
+                if other is None or other not in union.parent:
+                    return None
+                total += 1
+                correct += union.find(anchor) is union.find(other)
+        explanation = f"Symbolic grading: {correct} of {total} answer-key links are reproduced by the model."
+        return correct, total, explanation
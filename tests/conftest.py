@@ -0,0 +1,24 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUZZLES = os.path.join(ROOT, "data", "puzzles")
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def grader():
+    """LLM-based-puzzle-grader.py, which cannot be imported by name."""
+    spec = importlib.util.spec_from_file_location("puzzle_grader", os.path.join(ROOT, "LLM-based-puzzle-grader.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    from puzzle_corpus import PuzzleCorpus
+    return PuzzleCorpus(PUZZLES, use_snapshot=False)
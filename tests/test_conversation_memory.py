@@ -0,0 +1,91 @@
+import pytest
+
+import solvers
+from solvers import ConversationMemory, Decomposer, TokenBudgetExceeded
+
+EXAMPLES = ["example puzzle", "example reply"]
+
+
+def smt(n):
+    return f"Attempt {n}:\n(set-logic QF_LIA)\n(assert (= x {n}))\n(check-sat)\n(get-model)"
+
+
+def conversation(exchanges):
+    """Few-shot examples, the puzzle, then one reply and one solver output per exchange."""
+    history = EXAMPLES + ["puzzle"]
+    for n in range(1, exchanges + 1):
+        history += [smt(n), f"output {n}"]
+    return history
+
+
+class WordEncoding:
+    """Counts words instead of BPE tokens, so budgets are easy to reason about."""
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(solvers, "_encoding", WordEncoding())
+    solvers.count_tokens.cache_clear()
+    yield
+    solvers.count_tokens.cache_clear()
+
+
+def test_window_keeps_whole_exchanges_and_summarizes_the_rest():
+    window = ConversationMemory(keep_turns=2).window(conversation(4), fixed=len(EXAMPLES))
+    assert window[:2] == EXAMPLES
+    opening, kept = window[2], window[3:]
+    # User and LLM turns still alternate: the opening prompt, then reply/output pairs
+    assert kept == [smt(3), "output 3", smt(4), "output 4"]
+    assert opening.startswith("puzzle\n\n[2 earlier turns omitted.]")
+    assert "(assert (= x 2))" in opening and "The solver answered:\noutput 2" in opening
+    assert "(assert (= x 1))" not in opening
+
+
+def test_short_conversations_are_sent_whole():
+    history = conversation(2)
+    assert ConversationMemory(keep_turns=2).window(history, fixed=len(EXAMPLES)) == history
+
+
+def test_budget_drops_exchanges_until_the_call_fits(word_tokens):
+    history = conversation(4)
+    # The whole history is 55 words; the summary of dropped turns costs about two exchanges
+    memory = ConversationMemory(keep_turns=4, token_budget=50)
+    window = memory.window(history, fixed=len(EXAMPLES), role="solver role")
+    assert memory.within_budget(window, "solver role")
+    assert window[3:] == [smt(4), "output 4"]
+    assert window[2].startswith("puzzle\n\n[3 earlier turns omitted.]")
+
+
+def test_budget_that_cannot_be_met_raises(word_tokens):
+    memory = ConversationMemory(keep_turns=4, token_budget=10)
+    with pytest.raises(TokenBudgetExceeded):
+        memory.window(conversation(4), fixed=len(EXAMPLES), role="solver role")
+
+
+class EndlessSteps:
+    """Stands in for LLMApi: always has another step and records every window it is sent."""
+    role = "decomposer role"
+
+    def __init__(self):
+        self.windows = []
+
+    def get_response(self, messages):
+        self.windows.append(messages)
+        return f"Step {len(self.windows)}: eliminate another option."
+
+
+def test_gradual_decomp_stops_after_the_step_cap():
+    llm = EndlessSteps()
+    steps = Decomposer(llm).gradual_decomp("puzzle")
+    assert len(steps) == 20 and len(llm.windows) == 20
+    # Only the latest four exchanges are sent; earlier steps are listed in the opening turn
+    last = llm.windows[-1]
+    assert len(last) == 1 + 2 * 4
+    assert "Steps given so far:\nStep 1: eliminate another option." in last[0]
+
+
+def test_gradual_decomp_honours_a_custom_cap():
+    llm = EndlessSteps()
+    assert len(Decomposer(llm, ConversationMemory(max_steps=3)).gradual_decomp("puzzle")) == 3
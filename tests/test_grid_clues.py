@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from grid_clues import GridPuzzle, compile_clue, format_grid_answer, grade_grid_answer, parse_grid_answer
+from puzzle_corpus import PuzzleCorpus
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "puzzles")
+GRID_PUZZLES = [entry.puzzle_id for entry in PuzzleCorpus(PUZZLES, use_snapshot=False).entries if entry.family in ("1_*", "2_*")]
+
+
+def test_every_grid_puzzle_is_covered():
+    assert len(GRID_PUZZLES) == 55
+
+
+@pytest.mark.parametrize("puzzle_id", GRID_PUZZLES)
+def test_clues_have_a_unique_solution_equal_to_the_key(corpus, puzzle_id):
+    puzzle = corpus.get(puzzle_id)
+    grid = GridPuzzle(puzzle.entities, puzzle.clues)
+    key = parse_grid_answer(puzzle.answers)
+    assert grid.check(key) == []
+    solutions = grid.solutions()
+    assert solutions == [key]
+    assert grade_grid_answer(puzzle.answers, format_grid_answer(grid.categories, solutions[0])) == (len(key), len(key))
+
+
+def test_swapped_key_violates_clues(corpus):
+    puzzle = corpus.get("1_10")
+    grid = GridPuzzle(puzzle.entities, puzzle.clues)
+    key = parse_grid_answer(puzzle.answers)
+    first, second = [entity for entity in key if entity.startswith(next(iter(grid.categories)) + ":")][:2]
+    key[first], key[second] = key[second], key[first]
+    assert grid.check(key)
+    assert grid.explain(key).endswith("Therefore, it is inconsistent.")
+
+
+def test_unknown_clue_is_rejected():
+    with pytest.raises(ValueError):
+        compile_clue("1. Pet:frog is friends with Pet:cat", 3)
@@ -0,0 +1,47 @@
+import csv
+
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.parquet
+
+from llm_csv_processor import calculate_average, calculate_average_columnar
+from results_store import RESULT_COLUMNS, ResultsStore, TeeWriter, convert_csv, parse_grades
+
+GRADES = ["6/6", "3/6", "1", " 4/5 ", "0.5", "-1/2", "1e0", None, "", "N/A", "2/0", "3 / 4", "6/6"]
+
+
+def write_results(tmp_path, batch_rows):
+    csv_path = str(tmp_path / "results.csv")
+    rows = [[grade, f"puzzle {index}", "(check-sat)\n(get-model)", "a, b\nc, d", "convo", "Grade: x", "key"]
+            for index, grade in enumerate(GRADES)]
+    store = ResultsStore(str(tmp_path / "results"), batch_rows=batch_rows)
+    with open(csv_path, "w", newline="") as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(RESULT_COLUMNS)
+        writer = TeeWriter(csv_writer, store)
+        writer.writerow(rows[0])
+        writer.writerows(rows[1:])
+    store.close()
+    return csv_path, store, rows
+
+
+def test_parse_grades_accepts_what_fraction_accepts():
+    numerator, denominator = parse_grades(GRADES)
+    assert numerator.to_pylist() == [6, 3, 1, 4, 1, -1, 1, None, None, None, None, None, 6]
+    assert denominator.to_pylist() == [6, 6, 1, 5, 2, 2, 1, None, None, None, None, None, 6]
+
+
+@pytest.mark.parametrize("batch_rows", [1, 4, 1024])
+def test_store_round_trip_matches_csv_average(tmp_path, batch_rows):
+    csv_path, store, rows = write_results(tmp_path, batch_rows)
+    text = pyarrow.parquet.read_table(store.text_path)
+    assert text.column("row_id").to_pylist() == list(range(len(rows)))
+    assert text.column("Attempted Solution").to_pylist() == [row[3] for row in rows]
+    assert calculate_average_columnar(store.grades_path) == pytest.approx(calculate_average(csv_path))
+
+
+def test_convert_csv_matches_csv_average(tmp_path):
+    csv_path, _, _ = write_results(tmp_path, 1024)
+    grades_path = convert_csv(csv_path, str(tmp_path / "converted"))
+    assert calculate_average_columnar(grades_path) == pytest.approx(calculate_average(csv_path))
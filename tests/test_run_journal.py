@@ -0,0 +1,120 @@
+import os
+import shutil
+
+import pytest
+
+from puzzle_corpus import PuzzleCorpus
+from run_journal import RunJournal
+from solvers import ErrorResponse
+from z3_backends import SolverResult
+
+
+class Rows(list):
+    def writerows(self, rows):
+        self.extend(rows)
+
+
+def make_config(grader, tmp_path, **settings):
+    settings.setdefault("native_grid", True)
+    return grader.Config("gpt-3.5-turbo-0125", "gpt-4o-2024-05-13", smt_cache_size=0,
+                         journal_path=str(tmp_path / "journal.jsonl"), csv_name=str(tmp_path / "results.csv"), **settings)
+
+
+def run(grader, config, puzzles, monkeypatch):
+    solved = []
+    run_puzzle = grader.run_puzzle
+    def counting_run_puzzle(puzzle, config, csv_writer):
+        solved.append(puzzle.puzzle_id)
+        run_puzzle(puzzle, config, csv_writer)
+    monkeypatch.setattr(grader, "run_puzzle", counting_run_puzzle)
+    rows = Rows()
+    grader.run_journaled(config, puzzles, rows)
+    return sorted(solved), rows
+
+
+def test_replay_reuses_rows_for_the_same_fingerprint(grader, corpus, tmp_path, monkeypatch):
+    puzzles = corpus.select(ids=["1_10", "2_10"])
+    solved, rows = run(grader, make_config(grader, tmp_path), puzzles, monkeypatch)
+    assert solved == ["1_10", "2_10"]
+    replayed, replayed_rows = run(grader, make_config(grader, tmp_path), puzzles, monkeypatch)
+    assert replayed == []
+    assert replayed_rows == rows
+
+
+def test_replay_is_skipped_when_the_fingerprint_changes(grader, corpus, tmp_path, monkeypatch):
+    puzzles = corpus.select(ids=["1_10"])
+    run(grader, make_config(grader, tmp_path), puzzles, monkeypatch)
+    for settings in [{"symbolic_grading": True}, {"stream_smt": True}, {"z3_mode": "subprocess"},
+                     {"z3_binary": "/opt/z3/bin/z3"}, {"z3_timeout": 5}, {"z3_memory_mb": 512}]:
+        solved, _ = run(grader, make_config(grader, tmp_path, **settings), puzzles, monkeypatch)
+        assert solved == ["1_10"], settings
+
+
+def test_editing_parse_expected_changes_the_content_hash(corpus, tmp_path):
+    folder = tmp_path / "puzzle13"
+    shutil.copytree(corpus.select(ids=["puzzle13"]).entries[0].path, folder)
+    before = PuzzleCorpus(str(tmp_path)).entries[0]
+    with open(folder / "parseExpected.txt", "a") as file:
+        file.write("\n")
+    os.utime(folder / "parseExpected.txt", ns=(0, 0))  # An older mtime must still invalidate the snapshot
+    after = PuzzleCorpus(str(tmp_path)).entries[0]
+    assert after.content_hash != before.content_hash
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(str(path))
+    journal.commit("hash", "fingerprint", "1_10", [["6/6"]])
+    with open(path, "a") as file:
+        file.write('{"key": "other:fingerprint", "rows"')
+    reloaded = RunJournal(str(path))
+    assert reloaded.is_done("hash", "fingerprint")
+    assert not reloaded.is_done("other", "fingerprint")
+    reloaded.commit("other", "fingerprint", "1_11", [["5/6"]])
+    assert RunJournal(str(path)).rows("other", "fingerprint") == [["5/6"]]
+
+
+class FailingSolver:
+    cancel_event = None
+
+    def __init__(self, reply):
+        self.reply = reply
+
+    def clear(self):
+        pass
+
+    def window(self, prompt=None):
+        return [prompt]
+
+    def change_temp(self, temperature):
+        pass
+
+    def solve_puzzle(self, prompt):
+        return self.reply(), ""
+
+    def solve_with_z3(self, smt_lib_code):
+        return SolverResult("", "error")
+
+    def getConversation(self):
+        return ""
+
+
+class ZeroGrader:
+    def get_grade(self, *args):
+        return "", "0/6"
+
+
+def rate_limited():
+    raise RuntimeError("Rate limit reached")
+
+
+@pytest.mark.parametrize("reply", [rate_limited, lambda: ErrorResponse("Error: 503 Service Unavailable")])
+def test_failed_requests_stay_out_of_the_journal(grader, corpus, tmp_path, monkeypatch, reply):
+    config = make_config(grader, tmp_path, native_grid=False)
+    monkeypatch.setattr(config.agents, "smt_agents", lambda: (FailingSolver(reply), ZeroGrader(), None))
+    puzzles = corpus.select(ids=["1_10"])
+    solved, rows = run(grader, config, puzzles, monkeypatch)
+    assert solved == ["1_10"]
+    assert rows == []
+    entry = puzzles.entries[0]
+    assert not RunJournal(config.journal_path).is_done(entry.content_hash, config.fingerprint())
@@ -0,0 +1,67 @@
+from smt_diagnostics import group_diagnostics, parse_diagnostics, repair_message
+
+# Curly quotes around numbers, as LLMs sometimes write them, and one undeclared constant
+CODE = """(set-logic QF_LIA)
+(declare-const x Int)
+(assert (> x 1)) ;ok
+(assert (< x ‘5’))
+(assert (< y 9))
+(assert (distinct x ‘3’))
+(assert (> x ‘2’))
+(check-sat)
+(get-model)
+"""
+
+# z3's output for CODE: one error per byte of each curly quote, then a partial model
+OUTPUT = """(error "line 4 column 13: unexpected character")
+(error "line 4 column 14: unexpected character")
+(error "line 4 column 15: unexpected character")
+(error "line 4 column 17: unexpected character")
+(error "line 4 column 18: unexpected character")
+(error "line 4 column 19: unexpected character")
+(error "line 5 column 11: unknown constant y")
+(error "line 6 column 20: unexpected character")
+(error "line 6 column 21: unexpected character")
+(error "line 6 column 22: unexpected character")
+(error "line 6 column 24: unexpected character")
+(error "line 6 column 25: unexpected character")
+(error "line 6 column 26: unexpected character")
+(error "line 7 column 13: unexpected character")
+(error "line 7 column 14: unexpected character")
+(error "line 7 column 15: unexpected character")
+(error "line 7 column 17: unexpected character")
+(error "line 7 column 18: unexpected character")
+(error "line 7 column 19: unexpected character")
+sat
+(
+  (define-fun x () Int
+    2)
+)
+"""
+
+
+def test_repeated_errors_are_grouped_by_kind():
+    diagnostics = parse_diagnostics(OUTPUT)
+    assert len(diagnostics) == 19
+    assert group_diagnostics(diagnostics) == {("unexpected character", None): [4, 6, 7], ("unknown constant", "y"): [5]}
+
+
+def test_repair_message_quotes_only_the_first_offending_lines():
+    message = repair_message(OUTPUT, CODE).splitlines()
+    assert message[0].startswith("The solver reported 19 errors (2 distinct).")
+    assert message[1:3] == ["- unexpected character (lines 4, 6, 7)", "- unknown constant y (line 5)"]
+    # Two example lines per group: line 7 repeats the problem of lines 4 and 6
+    assert message[3:7] == ["Offending lines:", "4: (assert (< x ‘5’))", "5: (assert (< y 9))", "6: (assert (distinct x ‘3’))"]
+    assert message[7:] == ["Despite the errors the solver answered: sat"]
+
+
+def test_output_without_errors_is_passed_through():
+    output = "sat\n(\n  (define-fun x () Int\n    2)\n)\n"
+    assert repair_message(output, CODE) == output
+
+
+def test_groups_beyond_the_limit_are_counted():
+    output = "".join(f'(error "line {line} column 1: unknown constant c{line}")\n' for line in range(1, 5))
+    message = repair_message(output, CODE, max_groups=2)
+    assert "- ... and 2 more kinds of error" in message
+    assert "unknown constant c3" not in message
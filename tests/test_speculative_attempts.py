@@ -0,0 +1,49 @@
+from solvers import RequestCancelled
+from z3_backends import SolverResult
+
+SMT = "(set-logic QF_LIA)\n(check-sat)\n(get-model)"
+
+
+class ScriptedSolver:
+    """Replies with SMT-LIB on every turn; Z3 reports success from turn succeed_on onwards, never when it is None."""
+    def __init__(self, succeed_on=None):
+        self.succeed_on = succeed_on
+        self.cancel_event = None
+        self.turns = 0
+
+    def window(self, prompt=None):
+        return [prompt]
+
+    def solve_puzzle(self, prompt):
+        if self.succeed_on is None and self.turns > 0:
+            # The slow sibling is still writing its second reply when it is cancelled
+            if self.cancel_event.wait(10):
+                raise RequestCancelled()
+        self.turns += 1
+        return SMT, SMT
+
+    def solve_with_z3(self, smt_lib_code):
+        if self.succeed_on is not None and self.turns >= self.succeed_on:
+            return SolverResult("sat\n", "sat")
+        return SolverResult('(error "line 2 column 1: unexpected character")\n', "error")
+
+
+def test_first_successful_turn_cancels_the_other_attempts(grader, tmp_path, monkeypatch):
+    config = grader.Config("gpt-3.5-turbo-0125", "gpt-4o-2024-05-13", max_conversation_length=4, speculative_attempts=2,
+                           smt_cache_size=0, csv_name=str(tmp_path / "results.csv"))
+    fast, slow = ScriptedSolver(succeed_on=1), ScriptedSolver()
+    monkeypatch.setattr(config.agents, "speculative_solvers", lambda: [fast, slow])
+    solver, smt_result, smt_lib_code = grader.solve_speculatively("puzzle", config)
+    assert solver is fast and smt_result.status == "sat" and smt_lib_code == SMT
+    assert fast.turns == 1  # It stopped on its winning turn instead of finishing the conversation
+    assert slow.turns <= 1 and slow.cancel_event.is_set()
+
+
+def test_without_a_success_the_last_smt_is_kept(grader, tmp_path, monkeypatch):
+    config = grader.Config("gpt-3.5-turbo-0125", "gpt-4o-2024-05-13", max_conversation_length=2, speculative_attempts=2,
+                           smt_cache_size=0, csv_name=str(tmp_path / "results.csv"))
+    failing = [ScriptedSolver(succeed_on=99), ScriptedSolver(succeed_on=99)]
+    monkeypatch.setattr(config.agents, "speculative_solvers", lambda: failing)
+    solver, smt_result, smt_lib_code = grader.solve_speculatively("puzzle", config)
+    assert solver in failing and smt_result.status == "error" and smt_lib_code == SMT
+    assert [attempt.turns for attempt in failing] == [2, 2]
@@ -0,0 +1,91 @@
+from fractions import Fraction
+
+from symbolic_grader import SymbolicGrader, parse_z3_model
+
+POSITIONS = {"apricot": 1, "peas": 2, "onion": 3, "frog": 1, "goat": 2, "lizard": 3}
+
+
+def z3_model(positions, offset=0):
+    definitions = "\n".join(f"  (define-fun {name}_pos () Int\n    {position - offset})" for name, position in positions.items())
+    return f"sat\n(\n{definitions}\n)\n"
+
+
+class RecordingGrader:
+    def __init__(self):
+        self.calls = 0
+
+    def get_grade(self, answer_key, llm_answer, smt_output=None):
+        self.calls += 1
+        return "LLM grading", "0/6"
+
+
+def test_parse_z3_model_reads_nullary_definitions():
+    model = parse_z3_model("sat\n(\n  (define-fun a () Int\n    (- 2))\n  (define-fun b () Real\n    (/ 47.0 5.0))\n  (define-fun f ((x Int)) Int\n    x)\n)")
+    assert model == {"a": -2, "b": Fraction(47, 5)}
+
+
+def test_correct_model_gets_full_marks(corpus):
+    puzzle = corpus.get("1_10")
+    fallback = RecordingGrader()
+    explanation, grade = SymbolicGrader(fallback).get_grade(puzzle.answers, "", z3_model(POSITIONS), puzzle.entities)
+    assert grade == "6/6"
+    assert explanation.endswith("Grade: 6/6")
+    assert fallback.calls == 0
+
+
+def test_zero_based_model_gets_full_marks(corpus):
+    puzzle = corpus.get("1_10")
+    _, grade = SymbolicGrader().get_grade(puzzle.answers, "", z3_model(POSITIONS, offset=1), puzzle.entities)
+    assert grade == "6/6"
+
+
+def test_swapped_answers_lose_marks(corpus):
+    puzzle = corpus.get("1_10")
+    swapped = dict(POSITIONS, frog=POSITIONS["goat"], goat=POSITIONS["frog"])
+    _, grade = SymbolicGrader().get_grade(puzzle.answers, "", z3_model(swapped), puzzle.entities)
+    assert grade == "4/6"
+
+
+def test_unmappable_model_falls_back(corpus):
+    puzzle = corpus.get("1_10")
+    fallback = RecordingGrader()
+    _, grade = SymbolicGrader(fallback).get_grade(puzzle.answers, "", "sat\n(\n  (define-fun x () Int\n    1)\n)\n", puzzle.entities)
+    assert grade == "0/6"
+    assert fallback.calls == 1
+
+
+# answers.txt of "puzzle13 copy", one row per slot: baby, mother, month
+BIRTHS = [("Ling Ling", "Po Lang", "January"), ("Hua Mei", "Wang Yu", "February"),
+          ("Gao Gao", "Tai Shan", "March"), ("Den Ping", "Nan Sheng", "April")]
+
+
+def define(name, value):
+    return f"  (define-fun |{name}| () Int\n    {value})"
+
+
+def test_slot_model_is_not_read_as_month_numbers(corpus):
+    puzzle = corpus.get("puzzle13 copy")
+    fallback = RecordingGrader()
+    # Slot 1 holds the April birth, so reading 1 as January would misplace every row
+    slots = [4, 3, 2, 1]
+    model = "sat\n(\n" + "\n".join(define(name, slot) for row, slot in zip(BIRTHS, slots) for name in row) + "\n)\n"
+    _, grade = SymbolicGrader(fallback).get_grade(puzzle.answers, "", model, puzzle.entities)
+    assert grade == "8/8"
+    assert fallback.calls == 0
+
+
+def test_month_numbers_are_read_when_the_variable_names_the_month(corpus):
+    puzzle = corpus.get("puzzle13 copy")
+    definitions = []
+    for month, (baby, mother, _) in enumerate(BIRTHS, start=1):
+        definitions += [define(f"{baby} month", month), define(f"{mother} month", month)]
+    _, grade = SymbolicGrader().get_grade(puzzle.answers, "", "sat\n(\n" + "\n".join(definitions) + "\n)\n", puzzle.entities)
+    assert grade == "8/8"
+
+
+def test_integers_that_could_be_slots_or_months_fall_back(corpus):
+    puzzle = corpus.get("puzzle13 copy")
+    fallback = RecordingGrader()
+    model = "sat\n(\n" + "\n".join(define(name, slot) for slot, row in enumerate(BIRTHS, start=1) for name in row[:2]) + "\n)\n"
+    SymbolicGrader(fallback).get_grade(puzzle.answers, "", model, puzzle.entities)
+    assert fallback.calls == 1
@@ -0,0 +1,125 @@
+import shutil
+
+import pytest
+
+from clue_language import compiler
+from symbolic_grader import parse_z3_model
+from z3_backends import (CachedZ3Backend, IncrementalZ3Backend, InProcessZ3Backend, PooledZ3Backend, SolverResult,
+                         SubprocessZ3Backend, Z3Backend, make_z3_backend, z3)
+
+needs_binary = pytest.mark.skipif(shutil.which("z3") is None, reason="z3 binary not installed")
+needs_bindings = pytest.mark.skipif(z3 is None, reason="z3-solver bindings not installed")
+
+# x^3 + y^3 + z^3 = 33 has no small solution, so z3 keeps searching
+HARD_QUERY = """(set-logic QF_NIA)
+(declare-const x Int)
+(declare-const y Int)
+(declare-const z Int)
+(assert (= (+ (* x x x) (* y y y) (* z z z)) 33))
+(check-sat)
+(get-model)
+"""
+
+
+def few_shot_scripts(grader):
+    """The two scripts of the solver's few-shot example, extracted the way PuzzleSolver extracts queries."""
+    replies = [grader.example[1], grader.example[3]]
+    return [reply[reply.index("(set-logic"):reply.index("(get-model)") + len("(get-model)")].replace('`', '') for reply in replies]
+
+
+def reference_scripts(corpus):
+    """Reference encodings compiled from every parseExpected.txt in the corpus."""
+    return [compiler.compile(puzzle.entities, puzzle.parse_expected).smt_lib_code for puzzle in corpus if puzzle.parse_expected]
+
+
+@pytest.fixture(scope="module")
+def data_scripts(grader, corpus):
+    return few_shot_scripts(grader) + reference_scripts(corpus)
+
+
+@needs_binary
+@needs_bindings
+def test_inprocess_agrees_on_status_for_reference_encodings(corpus):
+    subprocess_backend = SubprocessZ3Backend()
+    inprocess = InProcessZ3Backend()
+    for script in reference_scripts(corpus):
+        assert inprocess.solve(script).status == subprocess_backend.solve(script).status
+
+
+@needs_binary
+def test_auto_prefers_the_binary():
+    assert isinstance(make_z3_backend("auto", cache_size=0), SubprocessZ3Backend)
+
+
+@needs_binary
+def test_pool_matches_subprocess(data_scripts):
+    subprocess_backend = SubprocessZ3Backend()
+    pool = PooledZ3Backend(size=2)
+    try:
+        for script in data_scripts:
+            expected = subprocess_backend.solve(script)
+            pooled = pool.solve(script)
+            assert (pooled.status, pooled.output) == (expected.status, expected.output)
+    finally:
+        pool.close()
+
+
+@needs_binary
+def test_incremental_matches_subprocess(data_scripts):
+    subprocess_backend = SubprocessZ3Backend()
+    incremental = IncrementalZ3Backend(subprocess_backend)
+    try:
+        for script in data_scripts:
+            expected = subprocess_backend.solve(script)
+            solved = incremental.solve(script)
+            assert solved.status == expected.status
+            # push/pop scopes can list the model's definitions in another order
+            assert parse_z3_model(solved.output) == parse_z3_model(expected.output)
+    finally:
+        incremental.close()
+
+
+@needs_binary
+@pytest.mark.parametrize("make_backend", [
+    lambda: SubprocessZ3Backend(timeout=1),
+    lambda: PooledZ3Backend(size=1, timeout=1),
+    lambda: IncrementalZ3Backend(SubprocessZ3Backend(timeout=1), timeout=1),
+    pytest.param(lambda: InProcessZ3Backend(timeout=1), marks=needs_bindings),
+])
+def test_timeouts_are_classified_as_timeout(make_backend):
+    result = make_backend().solve(HARD_QUERY)
+    assert result.status == "timeout"
+    assert result.output == "timeout\n"
+
+
+class FixedOutputBackend(Z3Backend):
+    def __init__(self, output, timeout=60, memory_mb=None):
+        self.output = output
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.calls = 0
+
+    def execute(self, smt_lib_code):
+        self.calls += 1
+        return self.output
+
+
+def test_cache_skips_unknown_and_resource_limited_results():
+    for output in ["unknown\n", 'unknown\n(error "line 7 column 10: model is not available")\n', '(error "out of memory")\n']:
+        backend = FixedOutputBackend(output)
+        cached = CachedZ3Backend(backend)
+        cached.solve("(check-sat)")
+        cached.solve("(check-sat)")
+        assert backend.calls == 2
+    assert not CachedZ3Backend.cacheable(SolverResult("timeout\n", "timeout"))
+
+
+def test_cache_key_includes_limits(tmp_path):
+    path = str(tmp_path / "smt_cache.sqlite")
+    short = FixedOutputBackend("sat\n", timeout=1)
+    CachedZ3Backend(short, path=path).solve("(check-sat)")
+    longer = FixedOutputBackend("sat\n", timeout=60)
+    result = CachedZ3Backend(longer, path=path).solve("(check-sat)")
+    assert not result.cached and longer.calls == 1
+    again = CachedZ3Backend(FixedOutputBackend("sat\n", timeout=1), path=path).solve("(check-sat)")
+    assert again.cached
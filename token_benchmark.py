@@ -0,0 +1,34 @@
+import os
+import time
+from solvers import count_tokens, get_encoding
+
+
+def build_session(puzzle_dir="./data/puzzles/puzzle01", turns=8):
+    """Builds a PuzzleSolver-shaped conversation: a long few-shot prefix followed by new turns."""
+    with open(os.path.join(puzzle_dir, "clues.txt")) as f:
+        clues = f.read()
+    few_shot = [clues * 40, "(set-logic QF_LIA)\n" + clues * 60, "sat\n" * 200, clues * 60, "sat\n" * 200, "I am done."]
+    new_turns = [f"turn {i}: " + clues for i in range(turns)]
+    return few_shot, new_turns
+
+
+def time_session(count, few_shot, new_turns):
+    conversation = list(few_shot)
+    per_turn = []
+    for turn in new_turns:
+        conversation.append(turn)
+        start = time.perf_counter()
+        sum(count(message) for message in conversation)
+        per_turn.append(time.perf_counter() - start)
+    return per_turn
+
+
+if __name__ == "__main__":
+    encoding = get_encoding()
+    few_shot, new_turns = build_session()
+    uncached = time_session(lambda message: len(encoding.encode(message)), few_shot, new_turns)
+    cached = time_session(count_tokens, few_shot, new_turns)
+    print("turn  re-encode (ms)  memoized (ms)")
+    for i, (a, b) in enumerate(zip(uncached, cached)):
+        print(f"{i:4d}  {a * 1000:14.3f}  {b * 1000:13.3f}")
+    print(f"total {sum(uncached) * 1000:14.3f}  {sum(cached) * 1000:13.3f}")
@@ -0,0 +1,85 @@
+import atexit
+import csv
+import sqlite3
+import threading
+from collections import defaultdict
+
+
+class TokenLedger:
+    """
+    Process-wide token accounting for every LLMApi instance.
+
+    Usage is aggregated in memory by (model, role) and flushed in batches to a
+    SQLite database with atomic upserts, so concurrent threads and overlapping
+    runs never lose each other's counts. Pending usage is flushed at exit.
+    """
+    def __init__(self, path="tokens_count.sqlite", flush_every=50):
+        self.path = path
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.pending = defaultdict(lambda: [0, 0, 0])  # (model, role) -> [sent, received, calls]
+        self.pending_calls = 0
+        atexit.register(self.flush)
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "model TEXT NOT NULL, role TEXT NOT NULL, "
+            "tokens_sent INTEGER NOT NULL, tokens_received INTEGER NOT NULL, calls INTEGER NOT NULL, "
+            "PRIMARY KEY (model, role))"
+        )
+        return connection
+
+    def record(self, model, role, tokens_sent, tokens_received):
+        with self.lock:
+            totals = self.pending[(model, role)]
+            totals[0] += tokens_sent
+            totals[1] += tokens_received
+            totals[2] += 1
+            self.pending_calls += 1
+            if self.pending_calls < self.flush_every:
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            batch = [(model, role, sent, received, calls) for (model, role), (sent, received, calls) in self.pending.items()]
+            self.pending.clear()
+            self.pending_calls = 0
+        # Write outside the lock so recorders are not blocked on disk I/O
+        connection = self.connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO tokens (model, role, tokens_sent, tokens_received, calls) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(model, role) DO UPDATE SET "
+                    "tokens_sent = tokens_sent + excluded.tokens_sent, "
+                    "tokens_received = tokens_received + excluded.tokens_received, "
+                    "calls = calls + excluded.calls",
+                    batch,
+                )
+        finally:
+            connection.close()
+
+    def totals_by_model(self):
+        self.flush()
+        connection = self.connect()
+        try:
+            return connection.execute(
+                "SELECT model, SUM(tokens_sent), SUM(tokens_received) FROM tokens GROUP BY model ORDER BY model"
+            ).fetchall()
+        finally:
+            connection.close()
+
+    def export_csv(self, filename="tokens_count.csv"):
+        """Writes per-model totals in the original tokens_count.csv layout."""
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['Model', 'Tokens Sent', 'Tokens Received'])
+            writer.writerows(self.totals_by_model())
+
+
+ledger = TokenLedger()
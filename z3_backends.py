@@ -0,0 +1,640 @@
+import atexit
+import csv
+import hashlib
+import os
+import queue
+import re
+import selectors
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+try:
+    import z3
+except ImportError:  # The in-process backend is optional
+    z3 = None
+
+DEFAULT_Z3_BINARY = os.environ.get("Z3_BINARY", "z3")
+
+
+class SolverTimeout(Exception):
+    pass
+
+
+class SolverResult:
+    """
+    Outcome of one solver call.
+
+    status is "sat", "unsat", "unknown", "timeout" or "error"; output keeps the
+    solver text that is fed back to the LLM.
+    """
+    def __init__(self, output, status, elapsed=0.0, query_size=0, cached=False):
+        self.output = output
+        self.status = status
+        self.elapsed = elapsed
+        self.query_size = query_size
+        self.cached = cached
+
+    @staticmethod
+    def classify(output):
+        if "(error" in output or output.startswith("An error occurred"):
+            return "error"
+        for line in output.splitlines():
+            if line.strip() in ("sat", "unsat", "unknown", "timeout"):
+                return line.strip()
+        return "unknown"
+
+    def __str__(self):
+        return self.output
+
+    def __repr__(self):
+        return f"SolverResult(status={self.status!r}, elapsed={self.elapsed:.3f}, query_size={self.query_size})"
+
+
+class SolverTelemetry:
+    """Thread-safe record of every solver call, used to find pathological puzzles."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+
+    def record(self, backend, smt_lib_code, result):
+        with self.lock:
+            self.records.append({
+                "time": time.time(),
+                "backend": type(backend).__name__,
+                "query_hash": _digest(smt_lib_code)[:16],
+                "query_size": result.query_size,
+                "status": result.status,
+                "elapsed": result.elapsed,
+                "cached": result.cached,
+            })
+
+    def slowest(self, n=10):
+        with self.lock:
+            return sorted(self.records, key=lambda record: record["elapsed"], reverse=True)[:n]
+
+    def summary(self):
+        with self.lock:
+            records = list(self.records)
+        by_status = {}
+        for record in records:
+            by_status[record["status"]] = by_status.get(record["status"], 0) + 1
+        return {"calls": len(records), "total_time": sum(record["elapsed"] for record in records), "by_status": by_status}
+
+    def export_csv(self, filename="solver_telemetry.csv"):
+        with self.lock:
+            records = list(self.records)
+        fieldnames = ["time", "backend", "query_hash", "query_size", "status", "elapsed", "cached"]
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(records)
+
+
+telemetry = SolverTelemetry()
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Z3Backend(ABC):
+    """Runs an SMT-LIB script and returns a SolverResult."""
+    def solve(self, smt_lib_code):
+        start = time.perf_counter()
+        try:
+            output = self.execute(smt_lib_code)
+            status = SolverResult.classify(output)
+        except SolverTimeout:
+            output, status = "timeout\n", "timeout"
+        result = SolverResult(output, status, time.perf_counter() - start, len(smt_lib_code))
+        telemetry.record(self, smt_lib_code, result)
+        return result
+
+    @abstractmethod
+    def execute(self, smt_lib_code):
+        """Returns the solver's textual output, raising SolverTimeout when the query runs too long."""
+        pass
+
+
+class SubprocessZ3Backend(Z3Backend):
+    def __init__(self, binary_path=DEFAULT_Z3_BINARY, timeout=60, memory_mb=None):
+        self.binary_path = binary_path
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+
+    def execute(self, smt_lib_code):
+        temp_file_name = None
+        try:
+            # Step 1: Create a temporary file
+            with tempfile.NamedTemporaryFile(mode='w+', suffix='.smt2', delete=False) as temp_file:
+                temp_file_name = temp_file.name
+                temp_file.write(smt_lib_code)
+
+            # Step 2: Execute Z3 with the temporary file
+            z3_command = [self.binary_path, temp_file_name]
+            if self.memory_mb:
+                z3_command.insert(1, f"-memory:{self.memory_mb}")
+            result = subprocess.run(z3_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=self.timeout)
+
+            # Step 3: Capture the output
+            output = result.stdout if result.stdout else result.stderr
+
+        except subprocess.TimeoutExpired:
+            raise SolverTimeout
+
+        except Exception as e:
+            output = f"An error occurred: {e}"
+
+        finally:
+            # Clean up the temporary file
+            if temp_file_name and os.path.exists(temp_file_name):
+                os.remove(temp_file_name)
+
+        return output
+
+
+class InProcessZ3Backend(Z3Backend):
+    """
+    Evaluates SMT-LIB text with the z3 Python bindings.
+
+    Z3_eval_smtlib2_string drives the SMT-LIB command interpreter, so results
+    and (error ...) lines have the binary's format, but not always its
+    content: the API context does not enforce the declared logic and reports
+    stray prose differently. It is therefore only chosen explicitly, or by
+    "auto" when no z3 binary is installed. Each query gets a fresh Context,
+    which keeps calls isolated and safe to run from several threads.
+
+    The timeout is a wall-clock guard that interrupts the call's own Context,
+    so it leaves other z3 users in the process alone; an interrupted query is
+    reported as a timeout like on the other backends. Z3 has no per-context
+    memory limit, so memory_mb sets the process-wide memory_max_size.
+    """
+    def __init__(self, timeout=60, memory_mb=None):
+        if z3 is None:
+            raise ImportError("The in-process Z3 backend requires the z3-solver package")
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        if memory_mb:
+            z3.set_param("memory_max_size", memory_mb)
+
+    def execute(self, smt_lib_code):
+        context = z3.Context()
+        expired = threading.Event()
+        def interrupt():
+            expired.set()
+            context.interrupt()
+        timer = threading.Timer(self.timeout, interrupt) if self.timeout else None
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+        try:
+            output = z3.Z3_eval_smtlib2_string(context.ref(), smt_lib_code)
+        except z3.Z3Exception as e:
+            message = e.value.decode() if isinstance(e.value, bytes) else str(e.value)
+            # Parser errors carry any output produced before the failure
+            output = message if "(error" in message else f'(error "{message.strip()}")\n'
+        except Exception as e:
+            output = f"An error occurred: {e}"
+        finally:
+            if timer is not None:
+                timer.cancel()
+        if expired.is_set():
+            raise SolverTimeout
+        return output
+
+
+def _is_balanced(smt_lib_code):
+    """Checks parentheses outside comments, strings and |quoted| symbols."""
+    depth = 0
+    in_string = in_symbol = in_comment = False
+    for char in smt_lib_code:
+        if in_comment:
+            in_comment = char != "\n"
+        elif in_string:
+            in_string = char != '"'
+        elif in_symbol:
+            in_symbol = char != "|"
+        elif char == ";":
+            in_comment = True
+        elif char == '"':
+            in_string = True
+        elif char == "|":
+            in_symbol = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0 and not in_string and not in_symbol
+
+
+class _Z3Worker:
+    """A long-lived `z3 -in` process that answers one query at a time."""
+    def __init__(self, binary_path, memory_mb=None):
+        command = [binary_path, "-in"]
+        if memory_mb:
+            command.append(f"-memory:{memory_mb}")
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        self.sentinel = f"z3-pool-{uuid.uuid4().hex}"
+        # z3 numbers lines from the start of the stream, so track where each query begins
+        self.line_offset = 0
+
+    def run(self, smt_lib_code, timeout, reset=True):
+        script = smt_lib_code if smt_lib_code.endswith("\n") else smt_lib_code + "\n"
+        script += f'(echo "{self.sentinel}")\n' + ("(reset)\n" if reset else "")
+        offset = self.line_offset
+        self.line_offset += script.count("\n")
+        self.process.stdin.write(script.encode())
+        self.process.stdin.flush()
+
+        marker = (self.sentinel + "\n").encode()
+        output = b""
+        deadline = time.monotonic() + timeout if timeout else None
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.process.stdout, selectors.EVENT_READ)
+            while not output.endswith(marker):
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError
+                if not selector.select(remaining):
+                    raise TimeoutError
+                chunk = os.read(self.process.stdout.fileno(), 65536)
+                if not chunk:
+                    # The script ended the process (e.g. with (exit)); keep what it printed
+                    self.process.wait()
+                    break
+                output += chunk
+        output = output.removesuffix(marker).decode()
+        return re.sub(r"line (\d+) column", lambda m: f"line {int(m.group(1)) - offset} column", output)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class PooledZ3Backend(Z3Backend):
+    """
+    Keeps a pool of `z3 -in` processes and pipes each query over stdin.
+
+    Queries are followed by an echo sentinel and (reset), so no temp file or
+    process spawn is needed per query. A worker that exceeds the timeout, hits
+    its memory limit or exits is killed and replaced. Scripts with unbalanced
+    parentheses would swallow the sentinel, so they go to a one-shot process.
+    """
+    def __init__(self, binary_path=DEFAULT_Z3_BINARY, size=4, timeout=60, memory_mb=None):
+        self.binary_path = binary_path
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.fallback = SubprocessZ3Backend(binary_path, timeout, memory_mb)
+        self.idle = queue.Queue()
+        self.slots = threading.Semaphore(size)
+        self.workers = set()
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def execute(self, smt_lib_code):
+        if not _is_balanced(smt_lib_code):
+            return self.fallback.execute(smt_lib_code)
+        with self.slots:
+            worker = self.acquire()
+            try:
+                output = worker.run(smt_lib_code, self.timeout)
+            except TimeoutError:
+                self.discard(worker)
+                raise SolverTimeout
+            except Exception as e:
+                self.discard(worker)
+                return f"An error occurred: {e}"
+            if worker.alive():
+                self.idle.put(worker)
+            else:
+                self.discard(worker)
+            return output
+
+    def acquire(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                worker = _Z3Worker(self.binary_path, self.memory_mb)
+                with self.lock:
+                    self.workers.add(worker)
+                return worker
+            if worker.alive():
+                return worker
+            self.discard(worker)
+
+    def discard(self, worker):
+        worker.kill()
+        with self.lock:
+            self.workers.discard(worker)
+
+    def close(self):
+        with self.lock:
+            workers = list(self.workers)
+            self.workers.clear()
+        for worker in workers:
+            worker.kill()
+
+
+def normalize_smt(smt_lib_code):
+    """Drops comments and collapses whitespace outside strings and |quoted| symbols."""
+    return " ".join(_smt_tokens(smt_lib_code))
+
+
+def _smt_tokens(smt_lib_code):
+    tokens = []
+    current = []
+    in_string = in_symbol = in_comment = False
+    for char in smt_lib_code:
+        if in_comment:
+            in_comment = char != "\n"
+            continue
+        if in_string or in_symbol:
+            current.append(char)
+            if (in_string and char == '"') or (in_symbol and char == "|"):
+                in_string = in_symbol = False
+            continue
+        if char == ";":
+            in_comment = True
+        elif char.isspace():
+            if current:
+                tokens.append("".join(current))
+                current = []
+        elif char in "()":
+            if current:
+                tokens.append("".join(current))
+                current = []
+            tokens.append(char)
+        else:
+            current.append(char)
+            in_string = char == '"'
+            in_symbol = char == "|"
+    if current:
+        tokens.append("".join(current))
+    return tokens
+
+
+def split_commands(smt_lib_code):
+    """Splits a script into its normalized top-level commands, or returns None when it is not well formed."""
+    tokens = _smt_tokens(smt_lib_code)
+    commands = []
+    current = []
+    depth = 0
+    for token in tokens:
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth < 0:
+                return None
+        elif depth == 0:
+            return None  # A bare atom outside any command
+        current.append(token)
+        if depth == 0:
+            commands.append(" ".join(current))
+            current = []
+    return commands if depth == 0 else None
+
+
+def _command_name(command):
+    return command[2:].split(" ", 1)[0]
+
+
+class IncrementalZ3Backend(Z3Backend):
+    """
+    Solves successive versions of one puzzle's SMT-LIB on a live `z3 -in` process.
+
+    Every declaration and assertion sits in its own push scope. A new query
+    is diffed against the previous one command by command; scopes past the
+    longest common prefix are popped and only the changed tail is sent, so
+    unchanged declarations and lemmas learned at lower scopes are kept.
+    Scripts that manage scopes themselves, interleave queries with
+    assertions, or produce an (error ...) are run on the fallback backend, so
+    error messages keep the line numbers of the original script.
+    """
+    HEADER = ("set-logic", "set-option", "set-info")
+    FRAMES = ("declare-fun", "declare-const", "declare-sort", "declare-datatype", "declare-datatypes", "define-fun", "define-fun-rec", "define-sort", "assert")
+    QUERIES = ("check-sat", "get-model", "get-value", "get-assignment", "get-info", "get-option", "get-unsat-core", "eval", "echo")
+
+    def __init__(self, fallback, binary_path=DEFAULT_Z3_BINARY, timeout=60, memory_mb=None):
+        self.fallback = fallback
+        self.binary_path = binary_path
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.worker = None
+        self.header = None
+        self.frames = []
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def solve(self, smt_lib_code):
+        start = time.perf_counter()
+        try:
+            output = self.execute_incremental(smt_lib_code)
+        except SolverTimeout:
+            output = "timeout\n"
+        if output is None or "(error" in output:
+            # Not expressible as a diff, or the exact one-shot output is needed
+            return self.fallback.solve(smt_lib_code)
+        result = SolverResult(output, SolverResult.classify(output), time.perf_counter() - start, len(smt_lib_code))
+        telemetry.record(self, smt_lib_code, result)
+        return result
+
+    def execute(self, smt_lib_code):
+        output = self.execute_incremental(smt_lib_code)
+        if output is None or "(error" in output:
+            return self.fallback.execute(smt_lib_code)
+        return output
+
+    def plan(self, smt_lib_code):
+        """Splits a script into (header, frames, queries), or None when it cannot be solved incrementally."""
+        commands = split_commands(smt_lib_code)
+        if not commands:
+            return None
+        names = [_command_name(command) for command in commands]
+        position = 0
+        while position < len(names) and names[position] in self.HEADER:
+            position += 1
+        header = commands[:position]
+        frames_end = position
+        while frames_end < len(names) and names[frames_end] in self.FRAMES:
+            frames_end += 1
+        if not all(name in self.QUERIES for name in names[frames_end:]):
+            return None
+        return header, commands[position:frames_end], commands[frames_end:]
+
+    def execute_incremental(self, smt_lib_code):
+        plan = self.plan(smt_lib_code)
+        if plan is None:
+            return None
+        header, frames, queries = plan
+        with self.lock:
+            if self.worker is None or not self.worker.alive():
+                self.restart()
+            script = []
+            if header != self.header:
+                script += ["(reset)"] + header
+                self.header = header
+                self.frames = []
+            common = 0
+            while common < min(len(frames), len(self.frames)) and frames[common] == self.frames[common]:
+                common += 1
+            if len(self.frames) > common:
+                script.append(f"(pop {len(self.frames) - common})")
+            for frame in frames[common:]:
+                script += ["(push 1)", frame]
+            script += queries
+            try:
+                output = self.worker.run("\n".join(script), self.timeout, reset=False)
+            except TimeoutError:
+                self.restart()
+                raise SolverTimeout
+            except Exception as e:
+                self.restart()
+                return f"An error occurred: {e}"
+            if not self.worker.alive():
+                self.restart()
+            elif "(error" in output:
+                # The live context may now differ from the script; the next query starts with (reset)
+                self.header = None
+                self.frames = []
+            else:
+                self.frames = frames
+            return output
+
+    def restart(self):
+        if self.worker is not None:
+            self.worker.kill()
+        self.worker = _Z3Worker(self.binary_path, self.memory_mb)
+        self.header = None
+        self.frames = []
+
+    def close(self):
+        with self.lock:
+            if self.worker is not None:
+                self.worker.kill()
+                self.worker = None
+
+
+class CachedZ3Backend(Z3Backend):
+    """
+    Memoizes solver output on the normalized SMT-LIB query.
+
+    An in-memory LRU tier sits in front of an optional SQLite tier shared
+    across runs. Outputs that cite line/column positions depend on the exact
+    layout, so they are only reused when the raw text matches too. Keys also
+    cover the backend kind and its time and memory limits. Timeouts, unknown
+    verdicts, resource-limit errors and backend failures are not cached, since
+    another run with other limits may decide them.
+    """
+    _POSITIONS = re.compile(r"line \d+ column \d+")
+    _RESOURCE_LIMITS = re.compile(r"out of memory|memory exceeded|canceled|resource limit|timeout", re.IGNORECASE)
+
+    def __init__(self, backend, max_entries=1024, path=None):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.memory = OrderedDict()  # normalized hash -> (raw hash, output)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.scope = f"{type(backend).__name__} timeout={getattr(backend, 'timeout', None)} memory_mb={getattr(backend, 'memory_mb', None)}\n"
+        self.connection = None
+        if path:
+            self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            with self.connection:
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS smt_results (key TEXT PRIMARY KEY, raw_key TEXT NOT NULL, output TEXT NOT NULL)"
+                )
+
+    def solve(self, smt_lib_code):
+        start = time.perf_counter()
+        key = _digest(self.scope + normalize_smt(smt_lib_code))
+        raw_key = _digest(smt_lib_code)
+        output = self.lookup(key, raw_key)
+        if output is not None:
+            result = SolverResult(output, SolverResult.classify(output), time.perf_counter() - start, len(smt_lib_code), cached=True)
+            telemetry.record(self, smt_lib_code, result)
+            return result
+        result = self.backend.solve(smt_lib_code)
+        if self.cacheable(result):
+            self.store(key, raw_key, result.output)
+        return result
+
+    def execute(self, smt_lib_code):
+        return self.backend.execute(smt_lib_code)
+
+    def lookup(self, key, raw_key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+            elif self.connection is not None:
+                row = self.connection.execute("SELECT raw_key, output FROM smt_results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = tuple(row)
+                    self.remember(key, entry)
+            if entry is not None and (entry[0] == raw_key or not self._POSITIONS.search(entry[1])):
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def store(self, key, raw_key, output):
+        with self.lock:
+            self.remember(key, (raw_key, output))
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO smt_results (key, raw_key, output) VALUES (?, ?, ?)", (key, raw_key, output)
+                    )
+
+    def remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    @classmethod
+    def cacheable(cls, result):
+        if result.status in ("timeout", "unknown") or result.output.startswith("An error occurred"):
+            return False
+        lines = [line.strip() for line in result.output.splitlines()]
+        if {"unknown", "timeout"} & set(lines):
+            return False
+        return not any(line.startswith("(error") and cls._RESOURCE_LIMITS.search(line) for line in lines)
+
+
+def make_z3_backend(mode="auto", binary_path=DEFAULT_Z3_BINARY, pool_size=4, timeout=60, memory_mb=None, cache_size=1024, cache_path=None):
+    """
+    Builds a solver backend.
+
+    mode is "inprocess", "subprocess", "pool" (long-lived binary workers), or
+    "auto" (the binary at binary_path when it is installed, otherwise the
+    in-process bindings). timeout is the wall-clock limit per query in
+    seconds and memory_mb the solver memory limit. Results are memoized unless cache_size is 0;
+    cache_path adds a SQLite tier that persists across runs.
+    """
+    if mode == "inprocess" or (mode == "auto" and z3 is not None and shutil.which(binary_path) is None):
+        backend = InProcessZ3Backend(timeout, memory_mb)
+    elif mode == "pool":
+        backend = PooledZ3Backend(binary_path, pool_size, timeout, memory_mb)
+    elif mode in ("subprocess", "auto"):
+        backend = SubprocessZ3Backend(binary_path, timeout, memory_mb)
+    else:
+        raise ValueError(f"Unsupported Z3 backend mode: {mode}")
+    if cache_size:
+        backend = CachedZ3Backend(backend, cache_size, cache_path)
+    return backend